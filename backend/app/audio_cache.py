@@ -0,0 +1,206 @@
+import array
+import asyncio
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+AudioChunk = Union[bytes, memoryview]
+
+
+class AudioCache:
+    """Content-addressed cache of synthesized PCM audio.
+
+    Entries are keyed by a hash of the spoken text, model and system
+    instruction. A bounded in-memory LRU tier holds the most recent replies;
+    the optional disk tier stores each reply as a raw `.pcm` segment file plus
+    an `.idx` file of chunk lengths, and replays it as memoryview slices over
+    an mmap so cached audio is never copied into Python buffers. Disk hits
+    are promoted to the memory tier as those same slices.
+
+    Disk I/O runs in a worker thread. The disk tier's size and recency are
+    tracked in memory, seeded from one directory scan at startup; segments
+    written by other workers sharing the directory join it when first read.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        max_disk_bytes: int = 1024 * 1024 * 1024
+    ):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, List[AudioChunk]]" = OrderedDict()
+        self._memory_bytes = 0
+        # key -> segment size, least recently used first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            for key, size, _ in sorted(self._disk_entries(), key=lambda entry: entry[2]):
+                self._disk[key] = size
+                self._disk_bytes += size
+
+    @staticmethod
+    def key(text: str, model: str, system_instruction: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model, system_instruction, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[Iterator[AudioChunk]]:
+        chunks = self._memory.get(key)
+        if chunks is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return iter(chunks)
+
+        if self.directory:
+            chunks = await asyncio.to_thread(self._read_disk, key)
+            if chunks is not None:
+                self.disk_hits += 1
+                self._put_memory(key, chunks)
+                return iter(chunks)
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, chunks: List[bytes]):
+        if not chunks:
+            return
+
+        self._put_memory(key, chunks)
+        if self.directory:
+            await asyncio.to_thread(self._write_disk, key, chunks)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses
+        }
+
+    def _put_memory(self, key: str, chunks: List[AudioChunk]):
+        size = sum(len(chunk) for chunk in chunks)
+        if size > self.max_memory_bytes:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= sum(len(chunk) for chunk in previous)
+
+        self._memory[key] = chunks
+        self._memory_bytes += size
+
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= sum(len(chunk) for chunk in evicted)
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        base = os.path.join(self.directory, key[:2], key)
+        return f"{base}.pcm", f"{base}.idx"
+
+    def _read_disk(self, key: str) -> Optional[List[AudioChunk]]:
+        pcm_path, idx_path = self._paths(key)
+        try:
+            with open(idx_path, "rb") as f:
+                lengths = array.array("I")
+                lengths.frombytes(f.read())
+            with open(pcm_path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if sum(lengths) != len(mapped):
+            return None
+
+        with self._disk_lock:
+            if key not in self._disk:
+                self._disk_bytes += len(mapped)
+            self._disk[key] = len(mapped)
+            self._disk.move_to_end(key)
+
+        # The mmap is released once the last slice is garbage collected;
+        # closing it explicitly would fail while a consumer holds a slice.
+        view = memoryview(mapped)
+        chunks = []
+        offset = 0
+        for length in lengths:
+            chunks.append(view[offset:offset + length])
+            offset += length
+        return chunks
+
+    def _write_disk(self, key: str, chunks: List[bytes]):
+        with self._disk_lock:
+            self._write_segment(key, chunks)
+
+    def _write_segment(self, key: str, chunks: List[bytes]):
+        if key in self._disk:
+            return
+
+        pcm_path, idx_path = self._paths(key)
+        directory = os.path.dirname(pcm_path)
+        os.makedirs(directory, exist_ok=True)
+        lengths = array.array("I", (len(chunk) for chunk in chunks))
+
+        # Write to uniquely named temporary files and rename, so readers never
+        # see partial audio and workers writing the same key don't collide
+        temporary = []
+        try:
+            for path, parts in ((pcm_path, chunks), (idx_path, [lengths.tobytes()])):
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                temporary.append(tmp_path)
+                with os.fdopen(fd, "wb") as f:
+                    for part in parts:
+                        f.write(part)
+            os.replace(temporary[0], pcm_path)
+            os.replace(temporary[1], idx_path)
+        finally:
+            for tmp_path in temporary:
+                try:
+                    os.remove(tmp_path)
+                except FileNotFoundError:
+                    pass
+
+        size = sum(lengths)
+        self._disk[key] = size
+        self._disk_bytes += size
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+
+    def _disk_entries(self) -> List[tuple[str, int, float]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".pcm"):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((name[:-4], stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict_disk(self):
+        # Least recently used segments go first until the disk tier is back under budget
+        while self._disk and self._disk_bytes > self.max_disk_bytes:
+            key, size = self._disk.popitem(last=False)
+            for stale in self._paths(key):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            self._disk_bytes -= size
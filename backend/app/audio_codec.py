@@ -0,0 +1,87 @@
+import asyncio
+import struct
+from typing import Optional
+
+try:
+    import opuslib
+except Exception:  # opuslib raises at import time when libopus is missing
+    opuslib = None
+
+SAMPLE_RATE = 24000
+CHANNELS = 1
+SAMPLE_WIDTH = 2
+
+
+def available_codecs() -> list[str]:
+    return ["opus", "pcm"] if opuslib is not None else ["pcm"]
+
+
+def negotiate_codec(requested: Optional[str]) -> str:
+    """Pick the codec the client asked for, falling back to raw PCM."""
+    if requested and requested.lower() in available_codecs():
+        return requested.lower()
+    return "pcm"
+
+
+class PCMStreamEncoder:
+    """Passes Gemini's 24 kHz 16-bit mono PCM through unchanged."""
+
+    codec = "pcm"
+
+    async def encode(self, pcm: bytes) -> bytes:
+        return pcm
+
+    async def flush(self) -> bytes:
+        return b""
+
+
+class OpusStreamEncoder:
+    """Incrementally encodes 24 kHz 16-bit mono PCM into Opus packets.
+
+    PCM is buffered into 20 ms frames; each WebSocket frame carries one or
+    more packets, each prefixed with its length as a big-endian uint16.
+    Encoding runs in a worker thread so it never blocks the event loop, and
+    callers await each chunk in turn, which keeps packets in order.
+    """
+
+    codec = "opus"
+    FRAME_SAMPLES = SAMPLE_RATE // 50
+    FRAME_BYTES = FRAME_SAMPLES * SAMPLE_WIDTH * CHANNELS
+
+    def __init__(self, bitrate: int = 24000):
+        self._encoder = opuslib.Encoder(SAMPLE_RATE, CHANNELS, opuslib.APPLICATION_VOIP)
+        self._encoder.bitrate = bitrate
+        self._buffer = bytearray()
+
+    async def encode(self, pcm: bytes) -> bytes:
+        self._buffer += pcm
+        if len(self._buffer) < self.FRAME_BYTES:
+            return b""
+
+        usable = len(self._buffer) - len(self._buffer) % self.FRAME_BYTES
+        frames = bytes(self._buffer[:usable])
+        del self._buffer[:usable]
+        return await asyncio.to_thread(self._encode_frames, frames)
+
+    async def flush(self) -> bytes:
+        if not self._buffer:
+            return b""
+
+        # Pad the final partial frame with silence
+        frame = bytes(self._buffer) + b"\0" * (self.FRAME_BYTES - len(self._buffer))
+        self._buffer.clear()
+        return await asyncio.to_thread(self._encode_frames, frame)
+
+    def _encode_frames(self, frames: bytes) -> bytes:
+        out = bytearray()
+        for offset in range(0, len(frames), self.FRAME_BYTES):
+            packet = self._encoder.encode(frames[offset:offset + self.FRAME_BYTES], self.FRAME_SAMPLES)
+            out += struct.pack(">H", len(packet))
+            out += packet
+        return bytes(out)
+
+
+def create_audio_encoder(codec: str, bitrate: int = 24000):
+    if codec == "opus" and opuslib is not None:
+        return OpusStreamEncoder(bitrate=bitrate)
+    return PCMStreamEncoder()
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after `ttl` seconds."""
+
+    _MISSING = object()
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key, self._MISSING)
+        if entry is self._MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if self.max_entries <= 0:
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one entry, or every entry when no key is given."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class PersistentTTLCache(TTLCache):
+    """TTLCache backed by a SQLite file so entries survive restarts.
+
+    Keys must be strings and values JSON-serializable. Reads are served from
+    memory; the database is only read at startup. Writes from `set` and
+    `invalidate` run in a worker thread in the background, one at a time,
+    so they never block the event loop. The table is trimmed back to
+    `max_entries` only once it has grown past it.
+    """
+
+    def __init__(self, path: str, max_entries: int = 256, ttl: float = 3600.0):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = asyncio.Lock()
+        self._pending: set[asyncio.Task] = set()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._load()
+        self._rows = self._db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def _load(self):
+        now = time.time()
+        self._db.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        self._db.commit()
+
+        rows = self._db.execute(
+            "SELECT key, value, expires_at FROM cache_entries ORDER BY expires_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+
+        # Oldest first so the most recently written entries end up most recently used
+        for key, value, expires_at in reversed(rows):
+            super().set(key, json.loads(value), ttl=expires_at - now)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        super().set(key, value, ttl=ttl)
+        if self.max_entries <= 0:
+            return
+
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._write(self._store, key, json.dumps(value), expires_at)
+
+    def invalidate(self, key: Optional[str] = None):
+        super().invalidate(key)
+        self._write(self._delete, key)
+
+    async def flush(self):
+        """Wait for every background write to finish."""
+        while self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def close(self):
+        await self.flush()
+        async with self._lock:
+            await asyncio.to_thread(self._db.close)
+
+    def _write(self, fn, *args):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. a script): nothing to block
+            fn(*args)
+            return
+        task = asyncio.create_task(self._run(fn, *args))
+        self._pending.add(task)
+        task.add_done_callback(self._write_done)
+
+    async def _run(self, fn, *args):
+        # One connection, so writes are serialized
+        async with self._lock:
+            await asyncio.to_thread(fn, *args)
+
+    def _write_done(self, task: asyncio.Task):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Completion cache write failed: {task.exception()}")
+
+    def _store(self, key: str, value: str, expires_at: float):
+        exists = self._db.execute("SELECT 1 FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at)
+        )
+        if not exists:
+            self._rows += 1
+        if self._rows > self.max_entries:
+            self._db.execute(
+                "DELETE FROM cache_entries WHERE key NOT IN ("
+                "SELECT key FROM cache_entries ORDER BY expires_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            self._rows = self._db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        self._db.commit()
+
+    def _delete(self, key: Optional[str]):
+        if key is None:
+            self._db.execute("DELETE FROM cache_entries")
+        else:
+            self._db.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        self._rows = self._db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        self._db.commit()
@@ -10,11 +10,96 @@ class Settings(BaseSettings):
     google_api_key: str
     gemini_model: str = "gemini-2.5-flash-native-audio-preview-09-2025"
 
+    # Warm pool of reusable Gemini Live sessions (0 opens a session per utterance)
+    gemini_session_pool_size: int = 0
+    gemini_session_max_age: float = 300.0
+    # Live sessions keep history; more than one turn per session shares
+    # context between visitors
+    gemini_session_max_turns: int = 1
+
+    # Bitrate for clients that negotiate Opus audio (`/ws?codec=opus`)
+    opus_bitrate: int = 24000
+
+    # Cache of synthesized speech keyed by text, model and system instruction
+    audio_cache_enabled: bool = True
+    audio_cache_memory_mb: int = 64
+    audio_cache_dir: Optional[str] = None
+    audio_cache_disk_mb: int = 1024
+
     host: str = "0.0.0.0"
     port: int = 8000
+    workers: int = 1
+    reload: bool = True
+
+    # Where conversation state is kept: "memory" (single worker) or "sqlite"
+    # (shared by all workers on the host through a WAL-mode database file)
+    session_store: str = "memory"
+    session_store_path: Optional[str] = None
+    session_ttl: float = 3600.0
 
     wildlife_image_index: str = "wildlife-images"
 
+    # Optional JSON file with `image_keywords` / `animal_keywords` for the message router
+    keywords_file: Optional[str] = None
+
+    # Shared HTTP connection pool used for all Elastic Cloud requests
+    elastic_max_connections: int = 100
+    elastic_max_keepalive_connections: int = 20
+    elastic_keepalive_expiry: float = 30.0
+    elastic_http2: bool = False
+
+    # Stream completions from Elastic's _stream inference endpoint token by token
+    elastic_stream_inference: bool = False
+
+    # In-process cache for wildlife image searches
+    image_cache_max_entries: int = 256
+    image_cache_ttl: float = 3600.0
+
+    # Answer image searches from an in-process BM25 index over a snapshot of
+    # the image index (loaded from IMAGE_INDEX_FILE or by scrolling Elastic),
+    # falling back to Elastic when the snapshot has no match
+    image_index_enabled: bool = False
+    image_index_file: Optional[str] = None
+    image_index_reload_interval: float = 3600.0
+
+    # Start the image search for animals named in a conversational message
+    # while the answer is generated: "warm" only fills the image cache,
+    # "attach" also sends the results as an `image_suggestions` frame.
+    # IMAGE_PREFETCH_BUDGET caps speculative searches per minute per worker
+    image_prefetch_enabled: bool = False
+    image_prefetch_mode: str = "warm"
+    image_prefetch_budget: int = 30
+
+    # What a new message does while the previous answer is still running:
+    # "cancel" interrupts it (barge-in), "queue" waits for it to finish
+    message_policy: str = "cancel"
+    message_queue_size: int = 8
+
+    # Per-connection outbound queue: audio is coalesced into frames of up to
+    # SEND_COALESCE_BYTES, and SLOW_CLIENT_POLICY ("pause", "drop" or
+    # "disconnect") applies once more than the high watermark is queued
+    send_queue_high_watermark: int = 1024 * 1024
+    send_queue_low_watermark: int = 256 * 1024
+    send_coalesce_bytes: int = 16 * 1024
+    slow_client_policy: str = "pause"
+
+    # Start speech synthesis per sentence while the reply is still generating
+    tts_pipeline_enabled: bool = False
+    tts_pipeline_concurrency: int = 2
+    tts_pipeline_min_sentence_chars: int = 40
+
+    # Completion cache for repeated questions (optionally persisted to a SQLite file)
+    completion_cache_max_entries: int = 512
+    completion_cache_ttl: float = 86400.0
+    completion_cache_path: Optional[str] = None
+
+    # JSON library for WebSocket frames and Elastic responses: "auto" (msgspec,
+    # then orjson, when installed), "msgspec", "orjson" or "stdlib"
+    json_backend: str = "auto"
+
+    # Token required on /admin endpoints (admin endpoints are disabled when unset)
+    admin_token: Optional[str] = None
+
     supabase_url: Optional[str] = None
     supabase_anon_key: Optional[str] = None
     supabase_service_role_key: Optional[str] = None
@@ -1,11 +1,19 @@
 import httpx
-import json
+import time
 import asyncio
 from typing import AsyncGenerator, Optional, Dict, Any
 from app.config import settings
+from app import serialization
+from app.cache import TTLCache, PersistentTTLCache
+from app.metrics import STAGE_LATENCY
+from app.singleflight import SingleFlight
+from app.image_index import SOURCE_FIELDS, ImageIndex, load_snapshot_file
 
 
 class ElasticAgentClient:
+    IMAGE_SEARCH_FILTER_PATH = "hits.hits._id,hits.hits._score,hits.hits._source"
+    SCROLL_FILTER_PATH = "_scroll_id,hits.hits._id,hits.hits._source"
+
     def __init__(self):
         self.base_url = settings.elastic_cloud_url.rstrip('/')
         self.api_key = settings.elastic_api_key
@@ -14,45 +22,308 @@ class ElasticAgentClient:
             "Authorization": f"ApiKey {self.api_key}",
             "Content-Type": "application/json"
         }
+        self._client: Optional[httpx.AsyncClient] = None
+        # Identical searches and completions that arrive while one is already
+        # in flight share its result instead of hitting Elastic again
+        self.single_flight = SingleFlight()
+        self.image_index: Optional[ImageIndex] = None
+        self._image_index_task: Optional[asyncio.Task] = None
+        self.image_cache = TTLCache(
+            max_entries=settings.image_cache_max_entries,
+            ttl=settings.image_cache_ttl
+        )
+        if settings.completion_cache_path:
+            self.completion_cache = PersistentTTLCache(
+                settings.completion_cache_path,
+                max_entries=settings.completion_cache_max_entries,
+                ttl=settings.completion_cache_ttl
+            )
+        else:
+            self.completion_cache = TTLCache(
+                max_entries=settings.completion_cache_max_entries,
+                ttl=settings.completion_cache_ttl
+            )
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            http2=settings.elastic_http2,
+            limits=httpx.Limits(
+                max_connections=settings.elastic_max_connections,
+                max_keepalive_connections=settings.elastic_max_keepalive_connections,
+                keepalive_expiry=settings.elastic_keepalive_expiry
+            ),
+            timeout=30.0
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Opened lazily so the client also works outside the FastAPI lifespan
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self):
+        """Open the shared connection pool (called from the app lifespan)."""
+        if self._client is None:
+            self._client = self._build_client()
+
+        if settings.image_index_enabled:
+            try:
+                await self.reload_image_index()
+            except Exception as e:
+                print(f"Image index load failed, searching Elastic only: {e}")
+            if settings.image_index_reload_interval > 0:
+                self._image_index_task = asyncio.create_task(self._reload_image_index_loop())
+
+    async def close(self):
+        if self._image_index_task:
+            self._image_index_task.cancel()
+            await asyncio.gather(self._image_index_task, return_exceptions=True)
+            self._image_index_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if isinstance(self.completion_cache, PersistentTTLCache):
+            await self.completion_cache.close()
+
+    async def reload_image_index(self) -> int:
+        """Rebuild the in-process image index and swap it in; returns its size."""
+        if settings.image_index_file:
+            hits = await asyncio.to_thread(load_snapshot_file, settings.image_index_file)
+        else:
+            hits = await self._scroll_images()
+        self.image_index = await asyncio.to_thread(ImageIndex, hits)
+        return len(self.image_index)
+
+    async def _reload_image_index_loop(self):
+        while True:
+            await asyncio.sleep(settings.image_index_reload_interval)
+            try:
+                await self.reload_image_index()
+            except Exception as e:
+                # Keep serving the previous snapshot
+                print(f"Image index reload failed: {e}")
+
+    async def _scroll_images(self) -> list[Dict[str, Any]]:
+        url = f"/{settings.wildlife_image_index}/_search"
+        body = {
+            "size": 500,
+            "sort": ["_doc"],
+            "_source": list(SOURCE_FIELDS)
+        }
+
+        response = await self.client.post(
+            url,
+            params={"scroll": "1m", "filter_path": self.SCROLL_FILTER_PATH},
+            json=body,
+            timeout=60.0
+        )
+        response.raise_for_status()
+        result = serialization.loads(response.content)
+        scroll_id = result.get("_scroll_id")
+        hits = result.get("hits", {}).get("hits", [])
+        batch = hits
+
+        try:
+            while batch and scroll_id:
+                response = await self.client.post(
+                    "/_search/scroll",
+                    params={"filter_path": self.SCROLL_FILTER_PATH},
+                    json={"scroll": "1m", "scroll_id": scroll_id},
+                    timeout=60.0
+                )
+                response.raise_for_status()
+                result = serialization.loads(response.content)
+                scroll_id = result.get("_scroll_id", scroll_id)
+                batch = result.get("hits", {}).get("hits", [])
+                hits.extend(batch)
+        finally:
+            if scroll_id:
+                try:
+                    await self.client.request("DELETE", "/_search/scroll", json={"scroll_id": [scroll_id]})
+                except httpx.HTTPError:
+                    pass
+
+        return hits
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Snapshot of the underlying httpcore connection pool."""
+        stats = {"open": 0, "idle": 0, "active": 0, "waiting": 0}
+        if self._client is None:
+            return stats
+
+        pool = getattr(self._client._transport, "_pool", None)
+        if pool is None:
+            return stats
+
+        for connection in getattr(pool, "connections", []):
+            if connection.is_closed():
+                continue
+            stats["open"] += 1
+            if connection.is_idle():
+                stats["idle"] += 1
+            else:
+                stats["active"] += 1
+
+        for request in getattr(pool, "_requests", []):
+            if getattr(request, "connection", None) is None:
+                stats["waiting"] += 1
+
+        return stats
 
     async def converse_async(
         self,
         input_text: str,
         conversation_id: Optional[str] = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
-        url = f"{self.base_url}/_inference/{self.inference_endpoint}"
+        cache_key = f"{self.inference_endpoint}:{self._normalize_prompt(input_text)}"
+        completion_text = self.completion_cache.get(cache_key)
+
+        if completion_text is not None:
+            yield {
+                "type": "content",
+                "content": completion_text
+            }
+
+        elif settings.elastic_stream_inference:
+            deltas = []
+            started = time.perf_counter()
+            async for delta in self._stream_completion(input_text):
+                if not deltas:
+                    STAGE_LATENCY.observe(time.perf_counter() - started, stage="elastic_first_token")
+                deltas.append(delta)
+                yield {
+                    "type": "content",
+                    "content": delta,
+                    "partial": True
+                }
+
+            STAGE_LATENCY.observe(time.perf_counter() - started, stage="elastic_inference")
+            completion_text = "".join(deltas)
+            if completion_text:
+                self.completion_cache.set(cache_key, completion_text)
+
+        else:
+            completion_text = await self.single_flight.do(
+                ("completion", cache_key),
+                lambda: self._complete(input_text, cache_key)
+            )
+
+            yield {
+                "type": "content",
+                "content": completion_text
+            }
+
+        yield {
+            "type": "complete",
+            "conversation_id": conversation_id
+        }
+
+    async def _complete(self, input_text: str, cache_key: str) -> str:
+        url = f"/_inference/{self.inference_endpoint}"
 
         payload = {
             "input": input_text
         }
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
+        with STAGE_LATENCY.time(stage="elastic_inference"):
+            response = await self.client.post(
                 url,
-                headers=self.headers,
-                json=payload
+                params={"filter_path": "completion.result"},
+                json=payload,
+                timeout=120.0
             )
+        response.raise_for_status()
+        result = serialization.loads(response.content)
+
+        completion_text = result.get("completion", [{}])[0].get("result", "")
+        if completion_text:
+            self.completion_cache.set(cache_key, completion_text)
+        return completion_text
+
+    async def _stream_completion(self, input_text: str) -> AsyncGenerator[str, None]:
+        """Yield completion text deltas from Elastic's streaming inference API.
+
+        The endpoint answers with server-sent events whose data lines look like
+        `{"completion": [{"delta": "..."}]}` and ends with `data: [DONE]`.
+        """
+        url = f"/_inference/completion/{self.inference_endpoint}/_stream"
+
+        payload = {
+            "input": input_text
+        }
+
+        async with self.client.stream(
+            "POST",
+            url,
+            json=payload,
+            headers={"Accept": "text/event-stream"},
+            timeout=httpx.Timeout(30.0, read=120.0)
+        ) as response:
             response.raise_for_status()
-            result = response.json()
 
-            completion_text = result.get("completion", [{}])[0].get("result", "")
+            async for event, data in self._iter_sse(response):
+                if data == "[DONE]":
+                    return
 
-            yield {
-                "type": "content",
-                "content": completion_text
-            }
+                result = serialization.loads(data)
+                if event == "error" or "error" in result:
+                    error = result.get("error", result)
+                    reason = error.get("reason") if isinstance(error, dict) else error
+                    raise RuntimeError(f"Elastic streaming inference failed: {reason}")
 
-            yield {
-                "type": "complete",
-                "conversation_id": conversation_id
-            }
+                for choice in result.get("completion", []):
+                    delta = choice.get("delta")
+                    if delta:
+                        yield delta
+
+    @staticmethod
+    async def _iter_sse(response: httpx.Response) -> AsyncGenerator[tuple[str, str], None]:
+        event = "message"
+        data_lines: list[str] = []
+
+        async for line in response.aiter_lines():
+            if not line:
+                if data_lines:
+                    yield event, "\n".join(data_lines)
+                event = "message"
+                data_lines = []
+            elif line.startswith(":"):
+                continue
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+
+        if data_lines:
+            yield event, "\n".join(data_lines)
 
     async def search_images(
         self,
         query: str,
         size: int = 6
     ) -> list[Dict[str, Any]]:
-        url = f"{self.base_url}/{settings.wildlife_image_index}/_search"
+        cache_key = (self._normalize_query(query), size)
+        cached = self.image_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if self.image_index is not None:
+            started = time.perf_counter()
+            results = self.image_index.search(query, size)
+            STAGE_LATENCY.observe(time.perf_counter() - started, stage="image_search_local")
+            if results:
+                return results
+
+        return await self.single_flight.do(
+            ("images", cache_key),
+            lambda: self._search_images(query, size, cache_key)
+        )
+
+    async def _search_images(self, query: str, size: int, cache_key: tuple) -> list[Dict[str, Any]]:
+        url = f"/{settings.wildlife_image_index}/_search"
 
         search_body = {
             "query": {
@@ -62,32 +333,34 @@ class ElasticAgentClient:
                     "fuzziness": "AUTO"
                 }
             },
-            "size": size
+            "size": size,
+            # Only the fields the client shows; the long description fields
+            # are searched but never sent back
+            "_source": ["photo_image_url", "photo_description"]
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
+        with STAGE_LATENCY.time(stage="image_search"):
+            response = await self.client.post(
                 url,
-                headers=self.headers,
-                json=search_body
+                params={"filter_path": self.IMAGE_SEARCH_FILTER_PATH},
+                json=search_body,
+                timeout=30.0
             )
-            response.raise_for_status()
-            result = response.json()
-
-            hits = result.get("hits", {}).get("hits", [])
-            formatted_results = []
-
-            for hit in hits:
-                formatted_results.append({
-                    "_id": hit["_id"],
-                    "_score": hit["_score"],
-                    "fields": {
-                        "photo_image_url": [hit["_source"].get("photo_image_url", "")],
-                        "photo_description": [hit["_source"].get("photo_description", "")]
-                    }
-                })
-
-            return formatted_results
+        response.raise_for_status()
+        # Decoded straight into the result shape; filter_path drops "hits"
+        # entirely when nothing matched, which decodes as no results
+        formatted_results = serialization.decode_image_hits(response.content)
+
+        self.image_cache.set(cache_key, formatted_results)
+        return formatted_results
+
+    @staticmethod
+    def _normalize_prompt(prompt: str) -> str:
+        return " ".join(prompt.lower().split()).rstrip("?!. ")
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        return " ".join(query.lower().split())
 
 
 elastic_client = ElasticAgentClient()
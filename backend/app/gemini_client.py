@@ -1,46 +1,117 @@
 import asyncio
 import io
-from typing import AsyncGenerator
+import time
+from typing import AsyncContextManager, AsyncGenerator, Optional
 from google import genai
 from google.genai import types
 import soundfile as sf
 import numpy as np
 from app.config import settings
+from app.live_session_pool import LiveSessionPool
+from app.audio_cache import AudioCache
+from app.metrics import ERRORS, FALLBACK_AUDIO, STAGE_LATENCY
 
 
 class GeminiAudioClient:
     def __init__(self):
         self.client = genai.Client(api_key=settings.google_api_key)
         self.model = settings.gemini_model
-
-    async def text_to_speech(self, text: str) -> AsyncGenerator[bytes, None]:
-        config = {
+        self.config = {
             "response_modalities": ["AUDIO"],
             "system_instruction": "You are a helpful assistant for the San San Pond Sak Wetlands. Speak in a warm, educational tone suitable for nature enthusiasts."
         }
+        self.session_pool: Optional[LiveSessionPool] = None
+        if settings.gemini_session_pool_size > 0:
+            self.session_pool = LiveSessionPool(
+                self._connect,
+                size=settings.gemini_session_pool_size,
+                max_age=settings.gemini_session_max_age,
+                max_turns=settings.gemini_session_max_turns
+            )
+        self._fallback_audio: Optional[bytes] = None
+        self.audio_cache: Optional[AudioCache] = None
+        if settings.audio_cache_enabled:
+            self.audio_cache = AudioCache(
+                directory=settings.audio_cache_dir,
+                max_memory_bytes=settings.audio_cache_memory_mb * 1024 * 1024,
+                max_disk_bytes=settings.audio_cache_disk_mb * 1024 * 1024
+            )
+
+    async def start(self):
+        if self.session_pool:
+            await self.session_pool.start()
+
+    async def close(self):
+        if self.session_pool:
+            await self.session_pool.close()
+
+    async def text_to_speech(self, text: str) -> AsyncGenerator[bytes, None]:
+        cache_key = None
+        if self.audio_cache:
+            cache_key = AudioCache.key(text, self.model, self.config["system_instruction"])
+            cached = await self.audio_cache.get(cache_key)
+            if cached is not None:
+                for audio_data in cached:
+                    yield audio_data
+                return
 
-        try:
-            async with self.client.aio.live.connect(model=self.model, config=config) as session:
-                await session.send(text, end_of_turn=True)
-
-                async for response in session.receive():
-                    if response.data:
-                        if hasattr(response, 'server_content'):
-                            server_content = response.server_content
-                            if server_content and hasattr(server_content, 'model_turn'):
-                                model_turn = server_content.model_turn
-                                if model_turn and hasattr(model_turn, 'parts'):
-                                    for part in model_turn.parts:
-                                        if hasattr(part, 'inline_data') and part.inline_data:
-                                            audio_data = part.inline_data.data
-                                            if audio_data:
-                                                yield audio_data
-
-        except Exception as e:
-            print(f"Gemini API error: {e}")
-            yield await self._generate_fallback_audio(text)
+        chunks = []
+        # A pooled session the server has dropped fails straight away; one
+        # retry on a freshly opened session avoids playing the fallback tone
+        attempts = [self.session_pool.session if self.session_pool else self._connect, self._connect]
+        for attempt, open_session in enumerate(attempts, 1):
+            started = time.perf_counter()
+            try:
+                async with open_session() as session:
+                    STAGE_LATENCY.observe(time.perf_counter() - started, stage="gemini_session_setup")
+                    async for audio_data in self._speak(session, text):
+                        chunks.append(audio_data)
+                        yield audio_data
+                break
+            except Exception as e:
+                ERRORS.inc(stage="gemini")
+                # Audio already sent can't be taken back, so only a turn that
+                # produced nothing is retried
+                if not chunks and attempt < len(attempts):
+                    print(f"Gemini API error, retrying on a new session: {e}")
+                    continue
+                print(f"Gemini API error: {e}")
+                FALLBACK_AUDIO.inc()
+                yield await self._generate_fallback_audio(text)
+                return
+
+        # Only complete Gemini replies are cached, never the fallback tone
+        if cache_key:
+            await self.audio_cache.put(cache_key, chunks)
+
+    def _connect(self) -> AsyncContextManager:
+        return self.client.aio.live.connect(model=self.model, config=self.config)
+
+    async def _speak(self, session, text: str) -> AsyncGenerator[bytes, None]:
+        await session.send(text, end_of_turn=True)
+
+        async for response in session.receive():
+            if response.data:
+                if hasattr(response, 'server_content'):
+                    server_content = response.server_content
+                    if server_content and hasattr(server_content, 'model_turn'):
+                        model_turn = server_content.model_turn
+                        if model_turn and hasattr(model_turn, 'parts'):
+                            for part in model_turn.parts:
+                                if hasattr(part, 'inline_data') and part.inline_data:
+                                    audio_data = part.inline_data.data
+                                    if audio_data:
+                                        yield audio_data
 
     async def _generate_fallback_audio(self, text: str) -> bytes:
+        # The tone doesn't depend on the text, so it is rendered once, off the
+        # event loop, and reused
+        if self._fallback_audio is None:
+            self._fallback_audio = await asyncio.to_thread(self._render_fallback_tone)
+        return self._fallback_audio
+
+    @staticmethod
+    def _render_fallback_tone() -> bytes:
         duration = 2.0
         sample_rate = 24000
         t = np.linspace(0, duration, int(sample_rate * duration))
@@ -0,0 +1,179 @@
+import heapq
+import json
+import math
+import re
+from array import array
+from typing import Any, Dict, List, Tuple
+
+SEARCH_FIELDS = ("photo_description", "species_name", "common_name", "english_name", "natural_description")
+SOURCE_FIELDS = SEARCH_FIELDS + ("photo_image_url",)
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lowercased word tokens, close to Elastic's standard analyzer."""
+    if not text:
+        return []
+    if isinstance(text, list):
+        text = " ".join(str(part) for part in text)
+    return _TOKEN.findall(str(text).lower())
+
+
+def fuzziness(term: str) -> int:
+    """Edit distance allowed by Elastic's `fuzziness: AUTO` (AUTO:3,6)."""
+    if len(term) < 3:
+        return 0
+    return 1 if len(term) < 6 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (Levenshtein plus transpositions),
+    giving up with `limit + 1` once the distance must exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, row = previous, row, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], before[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+    return row[-1]
+
+
+class ImageIndex:
+    """In-process BM25 index over a snapshot of the wildlife-images index.
+
+    Mirrors the `multi_match` query `search_images` sends to Elastic: each
+    field is scored with BM25 (k1=1.2, b=0.75, per-field statistics), query
+    terms match with `fuzziness: AUTO`, and a document's score is its best
+    field (`best_fields`). Fuzzy expansions are down-weighted by their edit
+    distance, so scores are close to, but not identical with, Elastic's.
+
+    Postings are stored per field as parallel arrays of document numbers and
+    term frequencies. The index is immutable; reloading builds a new one.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    MAX_EXPANSIONS = 50
+
+    def __init__(self, hits: List[Dict[str, Any]]):
+        self.results: List[Dict[str, Any]] = []
+        self._postings: Dict[str, Dict[str, Tuple[array, array]]] = {}
+        self._norms: Dict[str, array] = {}
+        self._field_docs: Dict[str, int] = {}
+        self._vocabulary: Dict[int, List[str]] = {}
+        self._expansions: Dict[str, List[Tuple[str, float]]] = {}
+
+        postings: Dict[str, Dict[str, Tuple[array, array]]] = {field: {} for field in SEARCH_FIELDS}
+        lengths = {field: array("I") for field in SEARCH_FIELDS}
+
+        for doc, hit in enumerate(hits):
+            source = hit.get("_source", {})
+            # Results are pre-built in the shape search_images returns
+            self.results.append({
+                "_id": hit["_id"],
+                "fields": {
+                    "photo_image_url": [source.get("photo_image_url", "")],
+                    "photo_description": [source.get("photo_description", "")]
+                }
+            })
+
+            for field in SEARCH_FIELDS:
+                tokens = tokenize(source.get(field))
+                lengths[field].append(len(tokens))
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, count in counts.items():
+                    docs, tfs = postings[field].setdefault(token, (array("I"), array("I")))
+                    docs.append(doc)
+                    tfs.append(count)
+
+        terms = set()
+        for field in SEARCH_FIELDS:
+            non_empty = [length for length in lengths[field] if length]
+            self._field_docs[field] = len(non_empty)
+            avgdl = sum(non_empty) / len(non_empty) if non_empty else 1.0
+            # BM25's length normalization only depends on the document, so
+            # it is computed once here rather than per posting at query time
+            self._norms[field] = array(
+                "d",
+                (self.K1 * (1 - self.B + self.B * length / avgdl) for length in lengths[field])
+            )
+            self._postings[field] = postings[field]
+            terms.update(postings[field])
+
+        for term in terms:
+            self._vocabulary.setdefault(len(term), []).append(term)
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def search(self, query: str, size: int = 6) -> List[Dict[str, Any]]:
+        terms = [self._expand(term) for term in tokenize(query)]
+        if not terms:
+            return []
+
+        best: Dict[int, float] = {}
+        for field in SEARCH_FIELDS:
+            for doc, score in self._score_field(field, terms).items():
+                if score > best.get(doc, 0.0):
+                    best[doc] = score
+
+        top = heapq.nlargest(size, best.items(), key=lambda item: item[1])
+        return [{**self.results[doc], "_score": round(score, 6)} for doc, score in top]
+
+    def _score_field(self, field: str, terms: List[List[Tuple[str, float]]]) -> Dict[int, float]:
+        postings = self._postings[field]
+        norms = self._norms[field]
+        field_docs = self._field_docs[field]
+        scores: Dict[int, float] = {}
+
+        for expansions in terms:
+            for term, weight in expansions:
+                entry = postings.get(term)
+                if entry is None:
+                    continue
+                docs, tfs = entry
+                idf = weight * math.log(1 + (field_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc, tf in zip(docs, tfs):
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf / (tf + norms[doc])
+        return scores
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """The indexed terms a query term matches, with their weights."""
+        cached = self._expansions.get(term)
+        if cached is not None:
+            return cached
+
+        limit = fuzziness(term)
+        matches = []
+        for length in range(len(term) - limit, len(term) + limit + 1):
+            for candidate in self._vocabulary.get(length, ()):
+                distance = 0 if candidate == term else edit_distance(term, candidate, limit)
+                if distance <= limit:
+                    weight = 1.0 - distance / min(len(term), len(candidate))
+                    matches.append((candidate, weight))
+
+        matches = heapq.nlargest(self.MAX_EXPANSIONS, matches, key=lambda match: match[1])
+        if len(self._expansions) < 10000:
+            self._expansions[term] = matches
+        return matches
+
+
+def load_snapshot_file(path: str) -> List[Dict[str, Any]]:
+    """Read hits from a JSON file: either a list of `{"_id", "_source"}`
+    objects or a saved `_search` response."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("hits", {}).get("hits", [])
+    return data
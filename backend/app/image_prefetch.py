@@ -0,0 +1,93 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class ImagePrefetcher:
+    """Speculative image searches for messages that mention animals.
+
+    When a conversational message names animals, the matching image search
+    is started alongside the text answer so the results are in the image
+    cache (or attached to the reply) before the user asks "show me". The
+    query is remembered for one turn so a follow-up image request without
+    animal names searches for the animals just discussed.
+
+    Speculation is capped by a token bucket of `budget_per_minute`
+    searches; messages over budget simply skip the prefetch.
+    """
+
+    def __init__(
+        self,
+        search: Callable[[str], Awaitable[List[Dict[str, Any]]]],
+        budget_per_minute: int = 30
+    ):
+        self._search = search
+        self.capacity = float(budget_per_minute)
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._last_query: Dict[str, str] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+        self.started = 0
+        self.over_budget = 0
+        self.used = 0
+
+    def prefetch(self, client_id: str, query: str) -> Optional[asyncio.Task]:
+        """Start a speculative search, or return None when over budget."""
+        self._last_query[client_id] = query
+        if not self._take_token():
+            self.over_budget += 1
+            return None
+
+        self.started += 1
+        task = asyncio.create_task(self._search(query))
+        # Detached on purpose: a barge-in cancels the turn, not the warm-up
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+        return task
+
+    def follow_up(self, client_id: str, wanted: bool) -> Optional[str]:
+        """Consume the query speculated on the client's previous turn.
+
+        Every message consumes it, so it only carries over one turn; it is
+        returned only when the caller `wanted` it.
+        """
+        query = self._last_query.pop(client_id, None)
+        if query is None or not wanted:
+            return None
+        self.used += 1
+        return query
+
+    def forget(self, client_id: str):
+        self._last_query.pop(client_id, None)
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "over_budget": self.over_budget,
+            "follow_ups_served": self.used,
+            "in_flight": len(self._tasks),
+            "budget_remaining": int(self._refill())
+        }
+
+    def _take_token(self) -> bool:
+        if self._refill() < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.capacity / 60)
+        self._refilled_at = now
+        return self._tokens
+
+    def _finished(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Image prefetch failed: {task.exception()}")
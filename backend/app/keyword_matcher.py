@@ -0,0 +1,96 @@
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple
+
+
+class KeywordMatch(NamedTuple):
+    category: str
+    keyword: str
+    start: int
+    end: int
+
+
+class KeywordMatcher:
+    """Finds every keyword from several categories in a single pass.
+
+    Keywords are compiled into a trie over whole words, and the message is
+    tokenized once with a precompiled regex. Each token is a dictionary
+    lookup, so matching cost grows with the message length rather than the
+    number of keywords (a Python regex alternation of thousands of words
+    tries every branch at every position). Keywords may span several words
+    ("looks like"), match on word boundaries only, and also match a trailing
+    plural "s"/"es" ("herons"). At each position the longest keyword wins.
+    Text is expected to be lowercased already.
+    """
+
+    _TOKEN = re.compile(r"\w+")
+    _TERMINAL = ""
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self._trie: Dict[str, Any] = {}
+        for category, keywords in groups.items():
+            for keyword in keywords:
+                words = keyword.lower().split()
+                if not words:
+                    continue
+
+                node = self._trie
+                for word in words:
+                    child = node.setdefault(word, {})
+                    # Plural spellings share the node of the singular word
+                    node.setdefault(word + "s", child)
+                    node.setdefault(word + "es", child)
+                    node = child
+
+                keyword, categories = node.setdefault(self._TERMINAL, (" ".join(words), []))
+                if category not in categories:
+                    categories.append(category)
+
+    def find(self, text: str) -> List[KeywordMatch]:
+        tokens = self._TOKEN.findall(text)
+        count = len(tokens)
+        get = self._trie.get
+        terminal = self._TERMINAL
+        matches = []
+        offsets: List[int] = []
+
+        i = 0
+        while i < count:
+            node = get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+
+            longest = None
+            j = i + 1
+            while True:
+                if terminal in node:
+                    longest = (j, node[terminal])
+                if j == count:
+                    break
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+
+            if longest is None:
+                i += 1
+                continue
+
+            end_index, (keyword, categories) = longest
+            self._locate(text, tokens, offsets, end_index)
+            start = offsets[i]
+            end = offsets[end_index - 1] + len(tokens[end_index - 1])
+            for category in categories:
+                matches.append(KeywordMatch(category, keyword, start, end))
+            i = end_index
+
+        return matches
+
+    @staticmethod
+    def _locate(text: str, tokens: List[str], offsets: List[int], upto: int):
+        """Extend `offsets` with the character offsets of tokens[:upto]."""
+        position = offsets[-1] + len(tokens[len(offsets) - 1]) if offsets else 0
+        for index in range(len(offsets), upto):
+            position = text.index(tokens[index], position)
+            offsets.append(position)
+            position += len(tokens[index])
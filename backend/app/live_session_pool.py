@@ -0,0 +1,199 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional
+
+
+class PooledSession:
+    def __init__(self, context: AsyncContextManager, session: Any):
+        self.context = context
+        self.session = session
+        self.created_at = time.monotonic()
+        self.turns = 0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class LiveSessionPool:
+    """Pre-opened Gemini Live sessions handed out to save the connection setup.
+
+    Up to `size` idle sessions are kept warm. A turn takes one if available
+    and otherwise connects directly, unpooled, rather than waiting for
+    another visitor's turn to finish, so the pool never limits how many
+    turns run at once. Sessions are replaced when they exceed `max_age` or
+    `max_turns`, or when a turn on them fails or is cancelled mid-stream,
+    since the session state is unknown at that point.
+
+    A Live session keeps its conversation history and the model answers in
+    that context, so with `max_turns` above 1 one visitor's turns can shape
+    another's reply. The default of 1 uses each pre-opened session for a
+    single turn and opens its replacement in the background.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], AsyncContextManager],
+        size: int = 2,
+        max_age: float = 300.0,
+        max_turns: int = 1,
+        health_check_interval: float = 30.0
+    ):
+        self._connect = connect
+        self.size = size
+        self.max_age = max_age
+        self.max_turns = max_turns
+        self.health_check_interval = health_check_interval
+
+        self._idle: List[PooledSession] = []
+        # Replacements being opened count towards `size`, so concurrent
+        # refills never overshoot it
+        self._opening = 0
+        self._background: set[asyncio.Task] = set()
+        self._health_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.opened = 0
+        self.discarded = 0
+        self.in_use = 0
+        self.warm = 0
+        self.cold = 0
+
+    async def start(self):
+        """Open `size` sessions up front and start the health check loop."""
+        await asyncio.gather(*(self._replenish() for _ in range(self.size)))
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self):
+        self._closed = True
+        if self._health_task:
+            self._health_task.cancel()
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(self._close_session(s) for s in idle), return_exceptions=True)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[Any]:
+        pooled = self._take_idle()
+        if pooled is None:
+            # No warm session: connect directly instead of waiting for one
+            self.cold += 1
+            if not self._closed:
+                self._spawn(self._replenish())
+            self.in_use += 1
+            try:
+                async with self._connect() as session:
+                    yield session
+            finally:
+                self.in_use -= 1
+            return
+
+        self.warm += 1
+        self.in_use += 1
+        try:
+            yield pooled.session
+        except BaseException:
+            self._discard(pooled)
+            raise
+        else:
+            pooled.turns += 1
+            self._release(pooled)
+        finally:
+            self.in_use -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "opening": self._opening,
+            "in_use": self.in_use,
+            "opened": self.opened,
+            "discarded": self.discarded,
+            "warm": self.warm,
+            "cold": self.cold
+        }
+
+    def _take_idle(self) -> Optional[PooledSession]:
+        while self._idle:
+            pooled = self._idle.pop()
+            if self._is_healthy(pooled):
+                return pooled
+            self._discard(pooled)
+        return None
+
+    def _release(self, pooled: PooledSession):
+        if self._closed or not self._is_healthy(pooled):
+            self._discard(pooled)
+        elif len(self._idle) + self._opening >= self.size:
+            # Replacements were opened while this session was busy
+            self._spawn(self._close_session(pooled))
+        else:
+            self._idle.append(pooled)
+
+    def _discard(self, pooled: PooledSession):
+        self.discarded += 1
+        self._spawn(self._close_session(pooled))
+        if not self._closed:
+            self._spawn(self._replenish())
+
+    async def _replenish(self):
+        # Keep warm sessions ready without exceeding the pool bound
+        if len(self._idle) + self._opening >= self.size:
+            return
+        self._opening += 1
+        try:
+            pooled = await self._open()
+        except Exception as e:
+            print(f"Gemini session warm-up failed: {e}")
+            return
+        finally:
+            self._opening -= 1
+        if self._closed or len(self._idle) >= self.size:
+            await self._close_session(pooled)
+        else:
+            self._idle.append(pooled)
+
+    async def _health_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            healthy = []
+            for pooled in self._idle:
+                if self._is_healthy(pooled):
+                    healthy.append(pooled)
+                else:
+                    self._discard(pooled)
+            self._idle = healthy
+
+    def _is_healthy(self, pooled: PooledSession) -> bool:
+        if pooled.age >= self.max_age or pooled.turns >= self.max_turns:
+            return False
+        ws = getattr(pooled.session, "_ws", None)
+        if ws is None:
+            return True
+        # websockets' ClientConnection (13.x) has no `closed`; both it and the
+        # legacy protocol expose `state`, which is OPEN until a close starts
+        state = getattr(ws, "state", None)
+        if state is not None:
+            return getattr(state, "name", None) == "OPEN"
+        return not getattr(ws, "closed", False)
+
+    async def _open(self) -> PooledSession:
+        context = self._connect()
+        session = await context.__aenter__()
+        self.opened += 1
+        return PooledSession(context, session)
+
+    async def _close_session(self, pooled: PooledSession):
+        try:
+            await pooled.context.__aexit__(None, None, None)
+        except Exception as e:
+            print(f"Gemini session close error: {e}")
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
@@ -1,10 +1,35 @@
+import secrets
 import uuid
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.websocket_handler import ws_handler
+from app.elastic_client import elastic_client
+from app.gemini_client import gemini_client
+from app.message_router import message_router
 from app.config import settings
+from app.metrics import registry
+from app.profiling import profile_event_loop, profile_running
 
-app = FastAPI(title="TerraTale Backend API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.keywords_file:
+        message_router.load_keywords_file(settings.keywords_file)
+    await elastic_client.start()
+    await gemini_client.start()
+    try:
+        yield
+    finally:
+        await gemini_client.close()
+        await elastic_client.close()
+        await ws_handler.image_prefetcher.close()
+        await ws_handler.sessions.close()
+
+
+app = FastAPI(title="TerraTale Backend API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +40,62 @@ app.add_middleware(
 )
 
 
+def _cache_samples():
+    caches = {
+        "image": elastic_client.image_cache.stats(),
+        "completion": elastic_client.completion_cache.stats()
+    }
+    if gemini_client.audio_cache:
+        audio = gemini_client.audio_cache.stats()
+        caches["audio"] = {"hits": audio["memory_hits"] + audio["disk_hits"], "misses": audio["misses"]}
+    samples = []
+    for cache, cache_stats in caches.items():
+        samples.append(((cache, "hit"), cache_stats["hits"]))
+        samples.append(((cache, "miss"), cache_stats["misses"]))
+    return samples
+
+
+# Values the app already tracks are read at scrape time, so exporting them
+# costs nothing on the request path
+registry.callback(
+    "terratale_cache_lookups_total",
+    "Cache lookups by cache and result",
+    "counter",
+    _cache_samples,
+    labelnames=("cache", "result")
+)
+registry.callback(
+    "terratale_active_connections",
+    "Open WebSocket connections",
+    "gauge",
+    lambda: [((), len(ws_handler.active_connections))]
+)
+registry.callback(
+    "terratale_elastic_pool_connections",
+    "Elastic HTTP connection pool by state",
+    "gauge",
+    lambda: [((state,), value) for state, value in elastic_client.pool_stats().items()],
+    labelnames=("state",)
+)
+registry.callback(
+    "terratale_gemini_session_acquisitions_total",
+    "Gemini Live sessions used for a turn, warm from the pool or connected on demand",
+    "counter",
+    lambda: [
+        (("warm",), gemini_client.session_pool.warm),
+        (("cold",), gemini_client.session_pool.cold)
+    ] if gemini_client.session_pool else [],
+    labelnames=("source",)
+)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
 @app.get("/")
 async def root():
     return {
@@ -29,10 +110,84 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/stats")
+async def stats():
+    return {
+        "elastic_pool": elastic_client.pool_stats(),
+        "image_cache": elastic_client.image_cache.stats(),
+        "completion_cache": elastic_client.completion_cache.stats(),
+        "elastic_single_flight": elastic_client.single_flight.stats(),
+        "image_prefetch": ws_handler.image_prefetcher.stats() if settings.image_prefetch_enabled else None,
+        "image_index_documents": len(elastic_client.image_index) if elastic_client.image_index else None,
+        "gemini_sessions": gemini_client.session_pool.stats() if gemini_client.session_pool else None,
+        "audio_cache": gemini_client.audio_cache.stats() if gemini_client.audio_cache else None
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/cache/images/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_image_cache():
+    """Called by the sync scripts after the wildlife-images index is rebuilt."""
+    dropped = len(elastic_client.image_cache)
+    elastic_client.image_cache.invalidate()
+    response = {"status": "invalidated", "entries_dropped": dropped}
+
+    if settings.image_index_enabled:
+        try:
+            response["image_index_documents"] = await elastic_client.reload_image_index()
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Image index reload failed: {e}")
+    return response
+
+
+@app.get("/admin/connections", dependencies=[Depends(require_admin)])
+async def connections():
+    """Outbound queue depth and send counters for every open WebSocket."""
+    return ws_handler.connection_stats()
+
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = 10.0,
+    sample_interval_ms: float = 5.0,
+    slow_callback_ms: float = 50.0,
+    format: str = "json"
+):
+    """Sample the event loop for a few seconds.
+
+    Returns loop lag, callbacks slower than `slow_callback_ms` and a
+    collapsed-stack profile; `format=collapsed` returns only the profile,
+    ready for flamegraph.pl or speedscope.
+    """
+    if not 0 < seconds <= 60:
+        raise HTTPException(status_code=400, detail="seconds must be between 0 and 60")
+    if profile_running():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    result = await profile_event_loop(
+        seconds,
+        sample_interval=max(sample_interval_ms, 1.0) / 1000,
+        slow_callback_threshold=slow_callback_ms / 1000
+    )
+    if format == "collapsed":
+        return PlainTextResponse(result["profile"])
+    return result
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     client_id = str(uuid.uuid4())
-    await ws_handler.connect(websocket, client_id)
+    await ws_handler.connect(
+        websocket,
+        client_id,
+        codec=websocket.query_params.get("codec"),
+        session_id=websocket.query_params.get("session_id")
+    )
 
     try:
         while True:
@@ -48,9 +203,19 @@ async def websocket_endpoint(websocket: WebSocket):
 
 if __name__ == "__main__":
     import uvicorn
+
+    if settings.session_store == "memory" and settings.workers > 1:
+        # Each worker would keep its own sessions, and a client whose next
+        # connection lands on another worker would lose its conversation
+        raise SystemExit(
+            f"SESSION_STORE=memory cannot be shared by {settings.workers} workers; use SESSION_STORE=sqlite"
+        )
+
     uvicorn.run(
         "app.main:app",
         host=settings.host,
         port=settings.port,
-        reload=True
+        workers=settings.workers,
+        # uvicorn cannot reload and run several workers at once
+        reload=settings.reload and settings.workers == 1
     )
@@ -1,5 +1,7 @@
-import re
-from typing import Dict, Any, Optional
+import json
+import string
+from typing import Dict, Any, Iterable, Optional
+from app.keyword_matcher import KeywordMatcher, KeywordMatch
 
 
 class MessageRouter:
@@ -16,55 +18,96 @@ class MessageRouter:
         'frog', 'snake', 'lizard', 'bat', 'otter', 'caiman'
     ]
 
+    # Words after "show" that say nothing about what to show
+    QUERY_FILLER = {
+        'me', 'us', 'a', 'an', 'the', 'some', 'any', 'more', 'it', 'them',
+        'of', 'please', 'again', 'like'
+    }
+
+    def __init__(self):
+        self.image_keywords = list(self.IMAGE_KEYWORDS)
+        self.animal_keywords = list(self.ANIMAL_KEYWORDS)
+        self._compile()
+
+    def load_keywords(
+        self,
+        image_keywords: Optional[Iterable[str]] = None,
+        animal_keywords: Optional[Iterable[str]] = None
+    ):
+        """Replace the keyword lists at runtime and recompile the matcher."""
+        if image_keywords is not None:
+            self.image_keywords = list(image_keywords)
+        if animal_keywords is not None:
+            self.animal_keywords = list(animal_keywords)
+        self._compile()
+
+    def load_keywords_file(self, path: str):
+        """Load keyword lists from a JSON file with `image_keywords` and/or `animal_keywords`."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.load_keywords(
+            image_keywords=data.get("image_keywords"),
+            animal_keywords=data.get("animal_keywords")
+        )
+
+    def _compile(self):
+        self._matcher = KeywordMatcher({
+            "image": self.image_keywords,
+            "animal": self.animal_keywords
+        })
+
     def analyze_intent(self, message: str) -> Dict[str, Any]:
         message_lower = message.lower()
+        matches = self._matcher.find(message_lower)
 
-        should_search_images = self._should_search_images(message_lower)
-        extracted_animals = self._extract_animals(message_lower)
+        image_matches = [m for m in matches if m.category == "image"]
+        extracted_animals = self._extract_animals(matches)
 
         return {
-            "search_images": should_search_images,
+            "search_images": bool(image_matches),
+            # A visual word ("show", "pictures") rather than only a question
+            # phrase ("what does"), which is usually not about looks
+            "visual_request": any(" " not in m.keyword for m in image_matches),
             "animals": extracted_animals,
-            "search_query": self._build_search_query(message_lower, extracted_animals)
+            "search_query": self._build_search_query(message_lower, extracted_animals, image_matches)
         }
 
-    def _should_search_images(self, message: str) -> bool:
-        for keyword in self.IMAGE_KEYWORDS:
-            if keyword in message:
-                return True
-
-        for animal in self.ANIMAL_KEYWORDS:
-            if animal in message:
-                has_visual_context = any(
-                    word in message for word in ['show', 'see', 'picture', 'photo', 'image']
-                )
-                if has_visual_context:
-                    return True
-
-        return False
-
-    def _extract_animals(self, message: str) -> list[str]:
+    def _extract_animals(self, matches: list[KeywordMatch]) -> list[str]:
         found_animals = []
-        for animal in self.ANIMAL_KEYWORDS:
-            if animal in message:
-                found_animals.append(animal)
+        for match in matches:
+            if match.category == "animal" and match.keyword not in found_animals:
+                found_animals.append(match.keyword)
         return found_animals
 
-    def _build_search_query(self, message: str, animals: list[str]) -> Optional[str]:
+    def _build_search_query(
+        self,
+        message: str,
+        animals: list[str],
+        image_matches: list[KeywordMatch]
+    ) -> Optional[str]:
         if animals:
             return " ".join(animals)
 
-        for keyword in self.IMAGE_KEYWORDS:
-            if keyword in message:
-                words = message.split()
-                try:
-                    idx = words.index(keyword)
-                    if idx + 1 < len(words):
-                        return " ".join(words[idx + 1:idx + 4])
-                except ValueError:
-                    continue
+        for match in image_matches:
+            # Question phrases ("what does", "how does") are usually about
+            # something other than looks; only a visual word like "show"
+            # is followed by what to search for
+            if " " in match.keyword:
+                continue
+            following = [
+                word for word in (w.strip(string.punctuation) for w in message[match.end:].split())
+                if word and not self._is_filler(word)
+            ]
+            if following:
+                return " ".join(following[:3])
 
         return None
 
+    def _is_filler(self, word: str) -> bool:
+        if word in self.QUERY_FILLER:
+            return True
+        singular = word[:-1] if word.endswith("s") else word
+        return word in self.image_keywords or singular in self.image_keywords
+
 
 message_router = MessageRouter()
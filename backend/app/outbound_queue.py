@@ -0,0 +1,166 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Union
+from fastapi import WebSocket
+from app import serialization
+
+AudioChunk = Union[bytes, memoryview]
+
+
+class SendQueueClosed(Exception):
+    """Raised to producers once the connection's send queue is closed."""
+
+
+class SlowClientError(SendQueueClosed):
+    """Raised to the producer when a client is disconnected for falling behind."""
+
+
+class OutboundQueue:
+    """Bounded, ordered send queue for one WebSocket connection.
+
+    Producers enqueue frames and return immediately while a writer task
+    drains the queue to the socket. Consecutive audio chunks are coalesced
+    into frames of up to `coalesce_bytes`. When the queued bytes exceed
+    `high_watermark`, audio is handled according to `policy`:
+
+    - "pause": the producer waits until the queue drains below `low_watermark`
+    - "drop": new audio chunks are discarded until the queue drains
+    - "disconnect": the connection is closed and SlowClientError is raised
+
+    JSON control frames are never dropped or delayed by the policy.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        high_watermark: int = 1024 * 1024,
+        low_watermark: int = 256 * 1024,
+        coalesce_bytes: int = 16 * 1024,
+        policy: str = "pause"
+    ):
+        self.websocket = websocket
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.coalesce_bytes = coalesce_bytes
+        self.policy = policy
+
+        # Items are [kind, payload, size]; audio payloads are lists of chunks
+        # so coalescing never copies until the frame is sent
+        self._frames: Deque[List[Any]] = deque()
+        self._queued_bytes = 0
+        self._ready = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._writer = asyncio.create_task(self._write_loop())
+        self._closed = False
+
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.audio_chunks_dropped = 0
+        self.paused_seconds = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queued_bytes
+
+    @property
+    def has_audio(self) -> bool:
+        """Whether audio frames are queued and not yet sent."""
+        return any(frame[0] == "bytes" for frame in self._frames)
+
+    async def send_json(self, payload: Dict[str, Any]):
+        self._check_open()
+        text = serialization.dumps(payload)
+        self._frames.append(["text", text, len(text)])
+        self._queued_bytes += len(text)
+        self._ready.set()
+
+    async def send_bytes(self, data: AudioChunk):
+        self._check_open()
+        if self._queued_bytes > self.high_watermark:
+            if self.policy == "drop":
+                self.audio_chunks_dropped += 1
+                return
+            if self.policy == "disconnect":
+                await self._disconnect_slow_client()
+            await self._wait_for_drain()
+
+        size = len(data)
+        tail = self._frames[-1] if self._frames else None
+        if tail is not None and tail[0] == "bytes" and tail[2] + size <= self.coalesce_bytes:
+            tail[1].append(data)
+            tail[2] += size
+        else:
+            self._frames.append(["bytes", [data], size])
+
+        self._queued_bytes += size
+        if self._queued_bytes > self.high_watermark:
+            self._drained.clear()
+        self._ready.set()
+
+    def discard_audio(self):
+        """Drop queued audio that has not been sent yet (e.g. after barge-in)."""
+        kept = deque(frame for frame in self._frames if frame[0] != "bytes")
+        self._queued_bytes -= sum(frame[2] for frame in self._frames if frame[0] == "bytes")
+        self._frames = kept
+        if self._queued_bytes <= self.low_watermark:
+            self._drained.set()
+
+    def close(self):
+        self._closed = True
+        self._writer.cancel()
+        self._frames.clear()
+        self._queued_bytes = 0
+        self._drained.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued_frames": len(self._frames),
+            "queued_bytes": self._queued_bytes,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "audio_chunks_dropped": self.audio_chunks_dropped,
+            "paused_seconds": round(self.paused_seconds, 3)
+        }
+
+    def _check_open(self):
+        if self._closed:
+            raise SendQueueClosed("Connection send queue is closed")
+
+    async def _wait_for_drain(self):
+        started = time.monotonic()
+        await self._drained.wait()
+        self.paused_seconds += time.monotonic() - started
+        self._check_open()
+
+    async def _disconnect_slow_client(self):
+        self.close()
+        try:
+            await self.websocket.close(code=1013, reason="Client too slow")
+        except Exception:
+            pass
+        raise SlowClientError("Client fell too far behind and was disconnected")
+
+    async def _write_loop(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self._frames:
+                    kind, payload, size = self._frames.popleft()
+                    if kind == "text":
+                        await self.websocket.send_text(payload)
+                    else:
+                        await self.websocket.send_bytes(payload[0] if len(payload) == 1 else b"".join(payload))
+
+                    self._queued_bytes -= size
+                    self.frames_sent += 1
+                    self.bytes_sent += size
+                    if self._queued_bytes <= self.low_watermark:
+                        self._drained.set()
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"WebSocket send error: {e}")
+            self.close()
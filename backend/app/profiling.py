@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+
+class StackSampler:
+    """Samples a thread's Python stack from a background thread.
+
+    Stacks are aggregated in the "collapsed" format understood by
+    flamegraph.pl and speedscope: one line per unique stack, frames
+    root-first separated by ';', followed by the sample count.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self._stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """Collects the "Executing <handle> took N seconds" warnings asyncio
+    emits in debug mode for callbacks slower than `slow_callback_duration`."""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.callbacks: List[Dict[str, Any]] = []
+
+    def emit(self, record: logging.LogRecord):
+        if str(record.msg).startswith("Executing") and isinstance(record.args, tuple) and len(record.args) == 2:
+            handle, duration = record.args
+            self.callbacks.append({"callback": str(handle), "seconds": round(duration, 4)})
+
+
+async def _measure_loop_lag(stop: asyncio.Event, interval: float) -> List[float]:
+    lags = []
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected))
+    return lags
+
+
+def _lag_summary(lags: List[float]) -> Dict[str, Any]:
+    if not lags:
+        return {"samples": 0}
+    ordered = sorted(lags)
+    return {
+        "samples": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3)
+    }
+
+
+_profile_lock = asyncio.Lock()
+
+
+def profile_running() -> bool:
+    return _profile_lock.locked()
+
+
+async def profile_event_loop(
+    seconds: float,
+    sample_interval: float = 0.005,
+    slow_callback_threshold: float = 0.05,
+    lag_interval: float = 0.01
+) -> Dict[str, Any]:
+    """Profile the running event loop for `seconds`.
+
+    Runs a stack sampler against the loop's thread, measures how late a
+    periodic timer fires (event-loop lag) and temporarily enables asyncio
+    debug mode to record callbacks that held the loop longer than
+    `slow_callback_threshold`. Debug mode has a cost of its own, so numbers
+    taken during a profile are somewhat pessimistic.
+    """
+    async with _profile_lock:
+        loop = asyncio.get_running_loop()
+        previous_debug = loop.get_debug()
+        previous_threshold = loop.slow_callback_duration
+
+        handler = _SlowCallbackHandler()
+        asyncio_logger = logging.getLogger("asyncio")
+        asyncio_logger.addHandler(handler)
+        loop.slow_callback_duration = slow_callback_threshold
+        loop.set_debug(True)
+
+        sampler = StackSampler(threading.get_ident(), interval=sample_interval)
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(_measure_loop_lag(stop, lag_interval))
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            lags = await lag_task
+            await asyncio.to_thread(sampler.stop)
+            loop.set_debug(previous_debug)
+            loop.slow_callback_duration = previous_threshold
+            asyncio_logger.removeHandler(handler)
+
+        return {
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "samples": sampler.samples,
+            "loop_lag": _lag_summary(lags),
+            "slow_callbacks": sorted(handler.callbacks, key=lambda c: c["seconds"], reverse=True),
+            "profile": sampler.collapsed()
+        }
@@ -0,0 +1,133 @@
+"""
+JSON encoding and decoding for WebSocket frames and Elastic responses.
+
+Uses msgspec or orjson when installed (JSON_BACKEND=auto picks the first
+available) and falls back to the standard library. All backends produce
+compact UTF-8 JSON and raise ValueError on malformed input.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from app.config import settings
+
+
+def available_backends() -> List[str]:
+    backends = []
+    if msgspec is not None:
+        backends.append("msgspec")
+    if orjson is not None:
+        backends.append("orjson")
+    return backends + ["stdlib"]
+
+
+def _select_backend(requested: str) -> str:
+    available = available_backends()
+    if requested == "auto":
+        return available[0]
+    if requested not in available:
+        print(f"JSON backend '{requested}' is not installed, using {available[0]}")
+        return available[0]
+    return requested
+
+
+backend = _select_backend(settings.json_backend)
+
+if backend == "msgspec":
+    _encoder = msgspec.json.Encoder()
+    _decoder = msgspec.json.Decoder()
+    _decode_error = msgspec.DecodeError
+
+    def dumps(obj: Any) -> str:
+        return _encoder.encode(obj).decode()
+
+    def _loads(data: Union[bytes, str]) -> Any:
+        return _decoder.decode(data)
+
+elif backend == "orjson":
+    _decode_error = orjson.JSONDecodeError
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    def _loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+else:
+    _decode_error = json.JSONDecodeError
+
+    def dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+    def _loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    try:
+        return _loads(data)
+    except _decode_error as e:
+        raise ValueError(f"Invalid JSON: {e}") from e
+
+
+if msgspec is not None and backend == "msgspec":
+    # Typed schema for image search responses: only the projected fields are
+    # decoded and everything else in the payload is skipped without building
+    # Python objects for it
+    class _ImageSource(msgspec.Struct):
+        photo_image_url: Optional[str] = ""
+        photo_description: Optional[str] = ""
+
+    class _ImageHit(msgspec.Struct):
+        id: str = msgspec.field(name="_id")
+        score: Optional[float] = msgspec.field(name="_score", default=None)
+        source: _ImageSource = msgspec.field(name="_source", default_factory=_ImageSource)
+
+    class _ImageHits(msgspec.Struct):
+        hits: List[_ImageHit] = []
+
+    class _ImageSearchResponse(msgspec.Struct):
+        hits: _ImageHits = msgspec.field(default_factory=_ImageHits)
+
+    _search_decoder = msgspec.json.Decoder(_ImageSearchResponse)
+
+    def decode_image_hits(data: bytes) -> List[Dict[str, Any]]:
+        try:
+            response = _search_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(f"Invalid search response: {e}") from e
+        return [
+            {
+                "_id": hit.id,
+                "_score": hit.score,
+                "fields": {
+                    "photo_image_url": [hit.source.photo_image_url],
+                    "photo_description": [hit.source.photo_description]
+                }
+            }
+            for hit in response.hits.hits
+        ]
+
+else:
+    def decode_image_hits(data: bytes) -> List[Dict[str, Any]]:
+        return [
+            {
+                "_id": hit["_id"],
+                "_score": hit["_score"],
+                "fields": {
+                    "photo_image_url": [hit["_source"].get("photo_image_url", "")],
+                    "photo_description": [hit["_source"].get("photo_description", "")]
+                }
+            }
+            for hit in loads(data).get("hits", {}).get("hits", [])
+        ]
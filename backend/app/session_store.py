@@ -0,0 +1,127 @@
+import asyncio
+from abc import ABC, abstractmethod
+import sqlite3
+import time
+from typing import Dict, Optional, Tuple
+
+
+class SessionStore(ABC):
+    """Conversation state per client session, shared by whoever reads it.
+
+    Sessions outlive a single WebSocket connection so a client reconnecting
+    with its `session_id` (possibly to a different worker) resumes the same
+    conversation. Entries expire `ttl` seconds after their last update.
+    """
+
+    @abstractmethod
+    async def get_conversation_id(self, session_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set_conversation_id(self, session_id: str, conversation_id: Optional[str]):
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str):
+        ...
+
+    async def close(self):
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """Per-process store; only suitable for a single worker."""
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._sessions: Dict[str, Tuple[float, Optional[str]]] = {}
+
+    async def get_conversation_id(self, session_id: str) -> Optional[str]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        expires_at, conversation_id = entry
+        if expires_at <= time.monotonic():
+            del self._sessions[session_id]
+            return None
+        return conversation_id
+
+    async def set_conversation_id(self, session_id: str, conversation_id: Optional[str]):
+        self._sessions[session_id] = (time.monotonic() + self.ttl, conversation_id)
+        if len(self._sessions) % 1000 == 0:
+            self._purge_expired()
+
+    async def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for session_id in [k for k, (expires_at, _) in self._sessions.items() if expires_at <= now]:
+            del self._sessions[session_id]
+
+
+class SQLiteSessionStore(SessionStore):
+    """Store shared by every worker on a host through a SQLite file in WAL mode.
+
+    WAL lets readers proceed while another worker writes. Queries run in a
+    worker thread so they never block the event loop.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600.0):
+        self.path = path
+        self.ttl = ttl
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._lock = asyncio.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, conversation_id TEXT, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        self._db.commit()
+
+    async def get_conversation_id(self, session_id: str) -> Optional[str]:
+        row = await self._run(
+            "SELECT conversation_id FROM sessions WHERE session_id = ? AND expires_at > ?",
+            (session_id, time.time()),
+            fetch=True
+        )
+        return row[0] if row else None
+
+    async def set_conversation_id(self, session_id: str, conversation_id: Optional[str]):
+        await self._run(
+            "INSERT OR REPLACE INTO sessions (session_id, conversation_id, expires_at) VALUES (?, ?, ?)",
+            (session_id, conversation_id, time.time() + self.ttl)
+        )
+
+    async def delete(self, session_id: str):
+        await self._run("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    async def close(self):
+        async with self._lock:
+            await asyncio.to_thread(self._db.close)
+
+    async def _run(self, sql: str, params: tuple, fetch: bool = False):
+        # One connection per store, so statements are serialized per worker
+        async with self._lock:
+            return await asyncio.to_thread(self._execute, sql, params, fetch)
+
+    def _execute(self, sql: str, params: tuple, fetch: bool):
+        cursor = self._db.execute(sql, params)
+        if fetch:
+            return cursor.fetchone()
+        self._db.commit()
+        return None
+
+
+def create_session_store(
+    backend: str,
+    path: Optional[str] = None,
+    ttl: float = 3600.0
+) -> SessionStore:
+    if backend == "sqlite":
+        return SQLiteSessionStore(path or "sessions.db", ttl=ttl)
+    if backend == "memory":
+        return InMemorySessionStore(ttl=ttl)
+    raise ValueError(f"Unknown session store backend: {backend}")
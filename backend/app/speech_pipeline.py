@@ -0,0 +1,118 @@
+import asyncio
+import re
+from contextlib import aclosing
+from typing import AsyncGenerator, Callable, List, Optional
+
+
+class SentenceSplitter:
+    """Splits text that arrives in pieces into complete sentences.
+
+    Sentences shorter than `min_chars` are merged with the next one so that
+    short fragments ("Yes." / "Hi!") don't each pay a full TTS round trip.
+    """
+
+    _BOUNDARY = re.compile(r'[.!?…]+["\')\]]*\s+')
+    # Word right before a boundary, including inner dots ("e.g")
+    _LAST_WORD = re.compile(r'([\w.]+)$')
+    # Periods after these don't end a sentence ("Dr. Smith", "e.g. herons")
+    ABBREVIATIONS = {
+        "dr", "mr", "mrs", "ms", "prof", "st", "mt", "jr", "sr", "vs",
+        "e.g", "i.e", "approx", "fig"
+    }
+
+    def __init__(self, min_chars: int = 40):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+
+        for match in self._BOUNDARY.finditer(self._buffer):
+            if self._is_abbreviation(match):
+                continue
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def _is_abbreviation(self, match: re.Match) -> bool:
+        if not match.group().startswith("."):
+            return False
+        word = self._LAST_WORD.search(self._buffer, 0, match.start())
+        if word is None:
+            return False
+        word = word.group(1)
+        # A single capital letter is an initial ("J. Smith")
+        return word.lower() in self.ABBREVIATIONS or (len(word) == 1 and word.isupper())
+
+    def flush(self) -> Optional[str]:
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return remainder or None
+
+
+class SpeechPipeline:
+    """Synthesizes sentences concurrently while emitting their audio in order.
+
+    Each sentence gets its own task and chunk queue; `audio()` drains the
+    queues in the order sentences were added, so playback order is kept even
+    when a later sentence finishes synthesizing first. A sentence that fails
+    to synthesize is skipped and the stream carries on with the next one.
+    """
+
+    _END = object()
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], AsyncGenerator[bytes, None]],
+        max_concurrency: int = 2
+    ):
+        self._synthesize = synthesize
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._segments: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    def add_sentence(self, text: str):
+        chunks: asyncio.Queue = asyncio.Queue()
+        self._tasks.append(asyncio.create_task(self._run(text, chunks)))
+        self._segments.put_nowait(chunks)
+
+    def close(self):
+        """Signal that no more sentences will be added."""
+        self._segments.put_nowait(self._END)
+
+    async def audio(self) -> AsyncGenerator[bytes, None]:
+        while True:
+            chunks = await self._segments.get()
+            if chunks is self._END:
+                return
+
+            while True:
+                item = await chunks.get()
+                if item is self._END:
+                    break
+                if isinstance(item, BaseException):
+                    print(f"Speech synthesis error, skipping sentence: {item}")
+                    continue
+                yield item
+
+    async def cancel(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, text: str, chunks: asyncio.Queue):
+        try:
+            async with self._semaphore:
+                async with aclosing(self._synthesize(text)) as audio_chunks:
+                    async for audio_chunk in audio_chunks:
+                        chunks.put_nowait(audio_chunk)
+        except Exception as e:
+            chunks.put_nowait(e)
+        finally:
+            chunks.put_nowait(self._END)
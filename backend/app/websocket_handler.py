@@ -1,102 +1,383 @@
 import json
+import re
+import time
+import uuid
 import asyncio
-from typing import Dict, Optional
+from contextlib import aclosing
+from typing import AsyncGenerator, Dict, Optional
 from fastapi import WebSocket
+from app.config import settings
 from app.elastic_client import elastic_client
 from app.gemini_client import gemini_client
 from app.message_router import message_router
+from app.image_prefetch import ImagePrefetcher
+from app.speech_pipeline import SentenceSplitter, SpeechPipeline
+from app.session_store import SessionStore, create_session_store
+from app.outbound_queue import OutboundQueue, SendQueueClosed
+from app.audio_codec import CHANNELS, SAMPLE_RATE, create_audio_encoder, negotiate_codec
+from app.metrics import ERRORS, IN_FLIGHT, STAGE_LATENCY
+
+
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
 
 
 class WebSocketHandler:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
-        self.conversation_ids: Dict[str, Optional[str]] = {}
+        # Conversation state lives in the session store so it survives
+        # reconnects and is visible to every worker
+        self.sessions: SessionStore = create_session_store(
+            settings.session_store,
+            path=settings.session_store_path,
+            ttl=settings.session_ttl
+        )
+        self.session_ids: Dict[str, str] = {}
+        self.audio_codecs: Dict[str, str] = {}
+        self.outbound: Dict[str, OutboundQueue] = {}
+        # In-flight message processing per client, and pending messages when
+        # MESSAGE_POLICY is "queue"
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.pending: Dict[str, asyncio.Queue] = {}
+        self.image_prefetcher = ImagePrefetcher(
+            elastic_client.search_images,
+            budget_per_minute=settings.image_prefetch_budget
+        )
 
-    async def connect(self, websocket: WebSocket, client_id: str):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        codec: Optional[str] = None,
+        session_id: Optional[str] = None
+    ):
         await websocket.accept()
         self.active_connections[client_id] = websocket
-        self.conversation_ids[client_id] = None
+        self.audio_codecs[client_id] = negotiate_codec(codec)
+        self.outbound[client_id] = OutboundQueue(
+            websocket,
+            high_watermark=settings.send_queue_high_watermark,
+            low_watermark=settings.send_queue_low_watermark,
+            coalesce_bytes=settings.send_coalesce_bytes,
+            policy=settings.slow_client_policy
+        )
+
+        # Resume the client's previous session when it sends a valid id
+        if session_id and SESSION_ID_PATTERN.match(session_id):
+            conversation_id = await self.sessions.get_conversation_id(session_id)
+        else:
+            session_id = uuid.uuid4().hex
+            conversation_id = None
+        self.session_ids[client_id] = session_id
+        await self.sessions.set_conversation_id(session_id, conversation_id)
+
+        await self.outbound[client_id].send_json({
+            "type": "session",
+            "session_id": session_id
+        })
+
+        # Only clients that asked for a codec expect the negotiation reply
+        if codec:
+            await self.outbound[client_id].send_json({
+                "type": "audio_format",
+                "codec": self.audio_codecs[client_id],
+                "sample_rate": SAMPLE_RATE,
+                "channels": CHANNELS
+            })
+
+    def connection_stats(self) -> Dict[str, Dict]:
+        return {client_id: outbound.stats() for client_id, outbound in self.outbound.items()}
 
     def disconnect(self, client_id: str):
         self.active_connections.pop(client_id, None)
-        self.conversation_ids.pop(client_id, None)
+        self.session_ids.pop(client_id, None)
+        self.audio_codecs.pop(client_id, None)
+        self.pending.pop(client_id, None)
+        self.image_prefetcher.forget(client_id)
+
+        outbound = self.outbound.pop(client_id, None)
+        if outbound:
+            outbound.close()
+
+        task = self.tasks.pop(client_id, None)
+        if task:
+            task.cancel()
 
     async def handle_message(self, client_id: str, message: str):
-        websocket = self.active_connections.get(client_id)
-        if not websocket:
+        """Schedule a message without blocking the connection's read loop.
+
+        With the "cancel" policy a new message interrupts the answer that is
+        still being generated or spoken (barge-in); with "queue" it waits for
+        the previous ones to finish.
+        """
+        outbound = self.outbound.get(client_id)
+        if not outbound:
             return
 
+        if settings.message_policy == "queue":
+            queue = self.pending.setdefault(client_id, asyncio.Queue(maxsize=settings.message_queue_size))
+            if queue.full():
+                await self._send_error(outbound, "Too many pending messages, please wait for the current answer")
+                return
+
+            queue.put_nowait(message)
+            task = self.tasks.get(client_id)
+            if task is None or task.done():
+                self.tasks[client_id] = asyncio.create_task(self._drain_queue(client_id, queue))
+        else:
+            await self._cancel_current(client_id)
+            self.tasks[client_id] = asyncio.create_task(self._process_message(client_id, message))
+
+    async def _cancel_current(self, client_id: str):
+        task = self.tasks.pop(client_id, None)
+        running = task is not None and not task.done()
+        if running:
+            # Wait for the cancelled work to unwind so its upstream connections
+            # are released before the next message starts
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        # Producers return once their frames are queued, so a finished turn
+        # can still have audio waiting for a slow client to drain it
+        outbound = self.outbound.get(client_id)
+        if outbound and (running or outbound.has_audio):
+            outbound.discard_audio()
+            await outbound.send_json({"type": "interrupted"})
+
+    async def _drain_queue(self, client_id: str, queue: asyncio.Queue):
+        while not queue.empty():
+            await self._process_message(client_id, queue.get_nowait())
+
+    async def _process_message(self, client_id: str, message: str):
+        outbound = self.outbound.get(client_id)
+        if not outbound:
+            return
+
+        IN_FLIGHT.inc()
         try:
+            started = time.perf_counter()
             intent = message_router.analyze_intent(message)
+            STAGE_LATENCY.observe(time.perf_counter() - started, stage="intent")
 
-            if intent["search_images"] and intent["search_query"]:
-                await self._handle_image_search(websocket, intent["search_query"])
+            search_query = intent["search_query"]
+            if settings.image_prefetch_enabled:
+                # A bare "show me" right after a message about manatees
+                # searches for the manatees, whose results were prefetched on
+                # that turn; anything naming its own subject, and questions
+                # like "what does the mangrove do?", are left alone
+                follow_up = self.image_prefetcher.follow_up(
+                    client_id,
+                    wanted=intent["visual_request"] and not search_query
+                )
+                search_query = follow_up or search_query
+
+            if intent["search_images"] and search_query:
+                await self._handle_image_search(outbound, search_query)
+            elif settings.image_prefetch_enabled and intent["animals"]:
+                await self._handle_text_with_prefetch(outbound, client_id, message, started, intent["animals"])
             else:
                 await self._handle_text_conversation(
-                    websocket,
+                    outbound,
                     client_id,
-                    message
+                    message,
+                    started
                 )
 
         except Exception as e:
-            await self._send_error(websocket, str(e))
+            ERRORS.inc(stage="message")
+            try:
+                await self._send_error(outbound, str(e))
+            except SendQueueClosed:
+                pass
+        finally:
+            IN_FLIGHT.dec()
 
-    async def _handle_text_conversation(
+    async def _handle_text_with_prefetch(
         self,
-        websocket: WebSocket,
+        outbound: OutboundQueue,
         client_id: str,
-        message: str
+        message: str,
+        turn_started: float,
+        animals: list[str]
     ):
-        response_text = ""
-        conversation_id = self.conversation_ids.get(client_id)
+        query = " ".join(animals)
+        prefetch = self.image_prefetcher.prefetch(client_id, query)
 
-        try:
-            async for event in elastic_client.converse_async(message, conversation_id):
-                if event.get("type") == "conversationId":
-                    self.conversation_ids[client_id] = event.get("conversationId")
+        suggestions_task = None
+        if prefetch and settings.image_prefetch_mode == "attach":
+            suggestions_task = asyncio.create_task(self._send_image_suggestions(outbound, query, prefetch))
 
-                elif event.get("type") == "content":
-                    content = event.get("content", "")
-                    response_text += content
+        try:
+            await self._handle_text_conversation(outbound, client_id, message, turn_started)
+            if suggestions_task:
+                await suggestions_task
+        finally:
+            if suggestions_task and not suggestions_task.done():
+                suggestions_task.cancel()
+                await asyncio.gather(suggestions_task, return_exceptions=True)
 
-        except Exception as e:
-            response_text = f"I apologize, but I encountered an error: {str(e)}"
+    async def _send_image_suggestions(self, outbound: OutboundQueue, query: str, prefetch: asyncio.Task):
+        try:
+            # Shielded so a barge-in doesn't cancel the search that warms the cache
+            results = await asyncio.shield(prefetch)
+        except Exception:
+            return
 
-        if response_text:
-            await websocket.send_json({
-                "type": "text",
-                "content": response_text
+        if results:
+            await outbound.send_json({
+                "type": "image_suggestions",
+                "query": query,
+                "content": results
             })
 
+    async def _handle_text_conversation(
+        self,
+        outbound: OutboundQueue,
+        client_id: str,
+        message: str,
+        turn_started: float
+    ):
+        response_text = ""
+        session_id = self.session_ids.get(client_id)
+        conversation_id = await self.sessions.get_conversation_id(session_id) if session_id else None
+
+        # In pipelined mode each finished sentence is sent to TTS while the
+        # rest of the reply is still being generated.
+        splitter = None
+        pipeline = None
+        audio_task = None
+        if settings.tts_pipeline_enabled:
+            splitter = SentenceSplitter(min_chars=settings.tts_pipeline_min_sentence_chars)
+            pipeline = SpeechPipeline(
+                gemini_client.text_to_speech,
+                max_concurrency=settings.tts_pipeline_concurrency
+            )
+            audio_task = asyncio.create_task(
+                self._send_audio(outbound, client_id, pipeline.audio(), turn_started)
+            )
+
+        try:
             try:
-                async for audio_chunk in gemini_client.text_to_speech(response_text):
-                    await websocket.send_bytes(audio_chunk)
+                async with aclosing(elastic_client.converse_async(message, conversation_id)) as events:
+                    async for event in events:
+                        if event.get("type") == "conversationId":
+                            if session_id:
+                                await self.sessions.set_conversation_id(session_id, event.get("conversationId"))
+
+                        elif event.get("type") == "content":
+                            content = event.get("content", "")
+                            response_text += content
+
+                            if event.get("partial") and content:
+                                await outbound.send_json({
+                                    "type": "text_delta",
+                                    "content": content
+                                })
+
+                            if pipeline:
+                                for sentence in splitter.feed(content):
+                                    pipeline.add_sentence(sentence)
 
-                await websocket.send_json({"type": "audio_end"})
+                if pipeline:
+                    remainder = splitter.flush()
+                    if remainder:
+                        pipeline.add_sentence(remainder)
 
             except Exception as e:
-                print(f"Audio generation error: {e}")
+                ERRORS.inc(stage="elastic_inference")
+                response_text = f"I apologize, but I encountered an error: {str(e)}"
+                if pipeline:
+                    # Drop the partial reply's sentences so only the apology is
+                    # spoken, matching the text frame below
+                    audio_task.cancel()
+                    await asyncio.gather(audio_task, return_exceptions=True)
+                    await pipeline.cancel()
+                    outbound.discard_audio()
+                    audio_task = None
+                    pipeline = None
+
+            if pipeline:
+                pipeline.close()
+
+            if response_text:
+                await outbound.send_json({
+                    "type": "text",
+                    "content": response_text
+                })
+
+                try:
+                    if audio_task:
+                        await audio_task
+                    else:
+                        await self._send_audio(
+                            outbound,
+                            client_id,
+                            gemini_client.text_to_speech(response_text),
+                            turn_started
+                        )
+
+                except Exception as e:
+                    ERRORS.inc(stage="audio")
+                    print(f"Audio generation error: {e}")
+
+        finally:
+            if audio_task:
+                audio_task.cancel()
+                await asyncio.gather(audio_task, return_exceptions=True)
+            if pipeline:
+                await pipeline.cancel()
+
+    async def _send_audio(
+        self,
+        outbound: OutboundQueue,
+        client_id: str,
+        audio_chunks: AsyncGenerator[bytes, None],
+        turn_started: float
+    ):
+        encoder = create_audio_encoder(
+            self.audio_codecs.get(client_id, "pcm"),
+            bitrate=settings.opus_bitrate
+        )
+        stream_started = time.perf_counter()
+        first_chunk = True
+
+        # aclosing() makes a cancelled stream release its Gemini session right away
+        async with aclosing(audio_chunks):
+            async for audio_chunk in audio_chunks:
+                if first_chunk:
+                    STAGE_LATENCY.observe(time.perf_counter() - turn_started, stage="time_to_first_audio")
+                    first_chunk = False
+                data = await encoder.encode(audio_chunk)
+                if data:
+                    await outbound.send_bytes(data)
+
+        tail = await encoder.flush()
+        if tail:
+            await outbound.send_bytes(tail)
+
+        await outbound.send_json({"type": "audio_end"})
+        STAGE_LATENCY.observe(time.perf_counter() - stream_started, stage="audio_stream")
 
-    async def _handle_image_search(self, websocket: WebSocket, query: str):
+    async def _handle_image_search(self, outbound: OutboundQueue, query: str):
         try:
             results = await elastic_client.search_images(query)
 
             if results:
-                await websocket.send_json({
+                await outbound.send_json({
                     "type": "image_search_results",
                     "content": results
                 })
             else:
-                await websocket.send_json({
+                await outbound.send_json({
                     "type": "text",
                     "content": f"I couldn't find any images matching '{query}'. Try asking about specific wildlife species found in the San San Pond Sak Wetlands."
                 })
 
         except Exception as e:
-            await self._send_error(websocket, f"Image search failed: {str(e)}")
+            ERRORS.inc(stage="image_search")
+            await self._send_error(outbound, f"Image search failed: {str(e)}")
 
-    async def _send_error(self, websocket: WebSocket, error_message: str):
-        await websocket.send_json({
+    async def _send_error(self, outbound: OutboundQueue, error_message: str):
+        await outbound.send_json({
             "type": "error",
             "content": error_message
         })
@@ -0,0 +1,164 @@
+"""
+Local stand-ins for Elastic and Gemini Live used by the load test.
+
+Two processes can be started from here:
+
+    python -m benchmarks.fake_services elastic --port 9200
+        Fake Elastic serving `_inference` (plain and `_stream`) and `_search`.
+
+    python -m benchmarks.fake_services app --port 8000
+        The real TerraTale app with Gemini Live replaced by a fake session
+        that streams silent PCM. Point it at the fake Elastic with
+        ELASTIC_CLOUD_URL.
+
+Latencies and sizes are read from BENCH_* environment variables (see
+`FakeConfig`) so the load test can vary them per run.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import AsyncIterator
+
+REPLY = (
+    "The San San Pond Sak wetlands shelter manatees, sloths and hundreds of bird species. "
+    "Mangroves line the channels and give young fish a safe place to grow. "
+    "Visitors often spot herons hunting along the river banks at dawn. "
+    "Sea turtles nest on the nearby beaches between March and September."
+)
+
+
+@dataclass
+class FakeConfig:
+    inference_latency: float = 0.4
+    stream_token_delay: float = 0.02
+    search_latency: float = 0.05
+    gemini_setup_latency: float = 0.15
+    gemini_first_chunk_latency: float = 0.3
+    gemini_chunk_interval: float = 0.05
+    gemini_chunk_bytes: int = 9600
+    gemini_chunks: int = 10
+
+    @classmethod
+    def from_env(cls) -> "FakeConfig":
+        config = cls()
+        for name, default in vars(cls()).items():
+            value = os.environ.get(f"BENCH_{name.upper()}")
+            if value is not None:
+                setattr(config, name, type(default)(value))
+        return config
+
+
+def create_fake_elastic(config: FakeConfig):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI(title="Fake Elastic")
+
+    @app.post("/_inference/completion/{endpoint}/_stream")
+    async def stream_completion(endpoint: str, request: Request):
+        await request.body()
+
+        async def events():
+            for word in REPLY.split(" "):
+                await asyncio.sleep(config.stream_token_delay)
+                yield f"data: {json.dumps({'completion': [{'delta': word + ' '}]})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/_inference/{endpoint}")
+    async def completion(endpoint: str, request: Request):
+        await request.body()
+        await asyncio.sleep(config.inference_latency)
+        return {"completion": [{"result": REPLY}]}
+
+    @app.post("/{index}/_search")
+    async def search(index: str, request: Request):
+        body = await request.json()
+        await asyncio.sleep(config.search_latency)
+        hits = [
+            {
+                "_id": f"img-{i}",
+                "_score": 1.0 - i / 10,
+                "_source": {
+                    "photo_image_url": f"https://example.org/wildlife/{i}.jpg",
+                    "photo_description": f"Photo {i} for {body.get('query', {}).get('multi_match', {}).get('query', '')}",
+                    "species_name": "Trichechus manatus",
+                    "common_name": "manatee"
+                }
+            }
+            for i in range(body.get("size", 6))
+        ]
+        return {"hits": {"total": {"value": len(hits)}, "hits": hits}}
+
+    return app
+
+
+class FakeLiveSession:
+    """Mimics the parts of a Gemini Live session the app uses."""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self._pending = 0
+
+    async def send(self, text: str, end_of_turn: bool = False):
+        self._pending += 1
+
+    async def receive(self) -> AsyncIterator[SimpleNamespace]:
+        if not self._pending:
+            return
+        self._pending -= 1
+
+        chunk = b"\0" * self.config.gemini_chunk_bytes
+        await asyncio.sleep(self.config.gemini_first_chunk_latency)
+        for i in range(self.config.gemini_chunks):
+            if i:
+                await asyncio.sleep(self.config.gemini_chunk_interval)
+            part = SimpleNamespace(inline_data=SimpleNamespace(data=chunk))
+            yield SimpleNamespace(
+                data=chunk,
+                server_content=SimpleNamespace(model_turn=SimpleNamespace(parts=[part]))
+            )
+
+
+class FakeLiveClient:
+    """Drop-in for `genai.Client` as far as `client.aio.live.connect` goes."""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.aio = SimpleNamespace(live=SimpleNamespace(connect=self.connect))
+
+    @asynccontextmanager
+    async def connect(self, model: str, config: dict) -> AsyncIterator[FakeLiveSession]:
+        await asyncio.sleep(self.config.gemini_setup_latency)
+        yield FakeLiveSession(self.config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("service", choices=["elastic", "app"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeConfig.from_env()
+    if args.service == "elastic":
+        app = create_fake_elastic(config)
+    else:
+        from app.gemini_client import gemini_client
+        from app.main import app
+
+        gemini_client.client = FakeLiveClient(config)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+End-to-end load test for the /ws endpoint.
+
+Starts the fake Elastic and the app (with a fake Gemini Live session, see
+`benchmarks.fake_services`) on local ports, then drives many concurrent
+WebSocket clients sending a mix of conversation and image-search messages.
+
+Reports throughput, p50/p95/p99 time to first text and time to first audio,
+and server memory per connection. Results can be saved as a baseline and
+later runs compared against it; the exit status is 1 when a metric regresses
+by more than the tolerance.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --clients 1000 --messages 3
+    python -m benchmarks.load_test --save-baseline benchmarks/baseline.json
+    python -m benchmarks.load_test --baseline benchmarks/baseline.json
+
+Extra app settings can be passed with `--app-env KEY=VALUE` (e.g.
+`--app-env ELASTIC_STREAM_INFERENCE=true`) and fake-service latencies with
+`--fake-env BENCH_GEMINI_CHUNKS=20`. Thousands of clients need a file
+descriptor limit above the client count (`ulimit -n`).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+TEXT_MESSAGES = [
+    "Tell me about the wetlands",
+    "What do manatees eat?",
+    "Why are mangroves important for the river?",
+    "When do sea turtles nest on the beach?",
+]
+
+IMAGE_MESSAGES = [
+    "Show me a manatee",
+    "Can I see pictures of herons?",
+    "Show me photos of sloths",
+]
+
+# Metrics where a higher value is a regression; throughput is the exception
+LOWER_IS_BETTER = {
+    "time_to_first_text_p50_ms", "time_to_first_text_p95_ms", "time_to_first_text_p99_ms",
+    "time_to_first_audio_p50_ms", "time_to_first_audio_p95_ms", "time_to_first_audio_p99_ms",
+    "memory_per_connection_kb", "error_rate"
+}
+HIGHER_IS_BETTER = {"throughput_turns_per_s"}
+
+
+@dataclass
+class ClientStats:
+    first_text: List[float] = field(default_factory=list)
+    first_audio: List[float] = field(default_factory=list)
+    turns: int = 0
+    errors: int = 0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_env(pairs: List[str]) -> Dict[str, str]:
+    env = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        env[key] = value
+    return env
+
+
+def rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def start_service(service: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_services", service, "--port", str(port)],
+        env={**os.environ, **env}
+    )
+
+
+async def wait_until_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+async def run_turn(ws, message: str, is_image: bool, stats: ClientStats, timeout: float):
+    """Send one message and wait for the reply to finish.
+
+    Image intents finish with the search results; conversations finish with
+    `audio_end`, and time to first text is taken from the first `text_delta`
+    or `text` frame.
+    """
+    started = time.perf_counter()
+    first = {}
+    await ws.send(message)
+
+    async def receive_reply() -> bool:
+        while True:
+            frame = await ws.recv()
+            now = time.perf_counter()
+
+            if isinstance(frame, bytes):
+                first.setdefault("audio", now - started)
+                continue
+
+            kind = json.loads(frame).get("type")
+            if kind in ("text_delta", "text", "image_search_results"):
+                first.setdefault("text", now - started)
+            if kind == "error":
+                return False
+            if kind in ("image_search_results", "audio_end") or (is_image and kind == "text"):
+                return True
+
+    if not await asyncio.wait_for(receive_reply(), timeout):
+        stats.errors += 1
+        return
+
+    stats.turns += 1
+    if "text" in first:
+        stats.first_text.append(first["text"])
+    if "audio" in first:
+        stats.first_audio.append(first["audio"])
+
+
+async def run_client(
+    url: str,
+    client_index: int,
+    args: argparse.Namespace,
+    stats: ClientStats,
+    connected: asyncio.Event,
+    all_connected: asyncio.Event,
+    counter: List[int]
+):
+    rng = random.Random(args.seed + client_index)
+    counted = False
+
+    def count_connection():
+        nonlocal counted
+        if not counted:
+            counted = True
+            counter[0] += 1
+            if counter[0] == args.clients:
+                all_connected.set()
+
+    try:
+        async with websockets.connect(url, max_size=None, open_timeout=args.timeout) as ws:
+            await ws.recv()  # session frame
+            count_connection()
+            await connected.wait()
+
+            for turn in range(args.messages):
+                is_image = rng.random() < args.image_ratio
+                message = rng.choice(IMAGE_MESSAGES if is_image else TEXT_MESSAGES)
+                if not is_image and not args.warm_cache:
+                    # A unique suffix keeps the completion and audio caches cold
+                    message = f"{message} (client {client_index}, turn {turn})"
+                try:
+                    await run_turn(ws, message, is_image, stats, args.timeout)
+                except (asyncio.TimeoutError, websockets.ConnectionClosed):
+                    stats.errors += 1
+                    return
+    except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+        stats.errors += 1
+        count_connection()
+
+
+async def run_load(args: argparse.Namespace, app_port: int, app_pid: int) -> Dict[str, Optional[float]]:
+    url = f"ws://127.0.0.1:{app_port}/ws"
+    if args.codec:
+        url += f"?codec={args.codec}"
+
+    stats = ClientStats()
+    connected = asyncio.Event()
+    all_connected = asyncio.Event()
+    counter = [0]
+    idle_rss = rss_kb(app_pid)
+
+    tasks = []
+    for index in range(args.clients):
+        tasks.append(asyncio.create_task(
+            run_client(url, index, args, stats, connected, all_connected, counter)
+        ))
+        if index % args.ramp_batch == args.ramp_batch - 1:
+            await asyncio.sleep(0.05)
+
+    await all_connected.wait()
+    connected_rss = rss_kb(app_pid)
+    # All clients start sending at once so concurrency is exactly --clients
+    started = time.perf_counter()
+    connected.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    memory_per_connection = None
+    if idle_rss is not None and connected_rss is not None:
+        memory_per_connection = (connected_rss - idle_rss) / args.clients
+
+    total = stats.turns + stats.errors
+    result = {
+        "clients": args.clients,
+        "turns": stats.turns,
+        "errors": stats.errors,
+        "error_rate": stats.errors / total if total else 0.0,
+        "elapsed_s": elapsed,
+        "throughput_turns_per_s": stats.turns / elapsed if elapsed else 0.0,
+        "memory_per_connection_kb": memory_per_connection
+    }
+    for name, values in (("time_to_first_text", stats.first_text), ("time_to_first_audio", stats.first_audio)):
+        for pct in (50, 95, 99):
+            value = percentile(values, pct)
+            result[f"{name}_p{pct}_ms"] = value * 1000 if value is not None else None
+    return result
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> bool:
+    """Print a comparison table and return True if any metric regressed."""
+    regressed = False
+    print(f"\n{'metric':<32} {'baseline':>12} {'current':>12} {'change':>9}")
+    for metric in sorted(LOWER_IS_BETTER | HIGHER_IS_BETTER):
+        old, new = baseline.get(metric), result.get(metric)
+        if old is None or new is None:
+            continue
+
+        change = (new - old) / old if old else 0.0
+        worse = change > tolerance if metric in LOWER_IS_BETTER else change < -tolerance
+        if metric == "error_rate":
+            worse = new > old + 0.001
+        regressed |= worse
+        flag = "  REGRESSION" if worse else ""
+        print(f"{metric:<32} {old:>12.2f} {new:>12.2f} {change:>+8.1%}{flag}")
+    return regressed
+
+
+def print_result(result: Dict):
+    print("=" * 60)
+    print("/ws load test")
+    print("=" * 60)
+    for key, value in result.items():
+        if isinstance(value, float):
+            print(f"  {key:<32} {value:12.2f}")
+        else:
+            print(f"  {key:<32} {value!s:>12}")
+    print("=" * 60)
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    elastic_port = free_port()
+    app_port = free_port()
+    fake_env = parse_env(args.fake_env)
+    app_env = {
+        "ELASTIC_CLOUD_URL": f"http://127.0.0.1:{elastic_port}",
+        "ELASTIC_API_KEY": "benchmark",
+        "GOOGLE_API_KEY": "benchmark",
+        "SESSION_STORE": "memory",
+        **fake_env,
+        **parse_env(args.app_env)
+    }
+
+    elastic = start_service("elastic", elastic_port, fake_env)
+    app = start_service("app", app_port, app_env)
+    try:
+        await wait_until_ready(f"http://127.0.0.1:{elastic_port}/")
+        await wait_until_ready(f"http://127.0.0.1:{app_port}/health")
+        result = await run_load(args, app_port, app.pid)
+    finally:
+        for process in (app, elastic):
+            process.terminate()
+        for process in (app, elastic):
+            process.wait(timeout=10)
+
+    print_result(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent WebSocket clients")
+    parser.add_argument("--messages", type=int, default=3, help="Messages sent by each client")
+    parser.add_argument("--image-ratio", type=float, default=0.3, help="Share of image-search messages")
+    parser.add_argument("--codec", choices=["pcm", "opus"], help="Audio codec requested by clients")
+    parser.add_argument("--warm-cache", action="store_true", help="Repeat prompts so the caches are hit")
+    parser.add_argument("--ramp-batch", type=int, default=100, help="Clients connected per 50 ms ramp step")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-turn timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--fake-env", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--baseline", help="Compare against this baseline JSON")
+    parser.add_argument("--save-baseline", help="Write the result to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
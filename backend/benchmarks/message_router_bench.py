@@ -0,0 +1,105 @@
+"""
+Micro-benchmark for MessageRouter.analyze_intent.
+
+Compares the compiled single-pass matcher against the previous approach of
+repeated substring scans, for the shipped keyword lists and for lists grown
+with synthetic species names.
+
+Usage (from the backend directory):
+    python -m benchmarks.message_router_bench
+"""
+
+import timeit
+from typing import Optional
+
+from app.message_router import MessageRouter
+
+MESSAGES = [
+    "Show me a manatee please",
+    "What does the three-toed sloth eat during the rainy season?",
+    "Tell me about the history of San San Pond Sak wetlands and its mangroves",
+    "Can I see pictures of herons and kingfishers near the river?",
+    "How many turtles nest on the beach every year?",
+]
+
+
+class SubstringRouter:
+    """The previous implementation: several `in` scans per message."""
+
+    def __init__(self, image_keywords, animal_keywords):
+        self.image_keywords = image_keywords
+        self.animal_keywords = animal_keywords
+
+    def analyze_intent(self, message: str):
+        message_lower = message.lower()
+        animals = [a for a in self.animal_keywords if a in message_lower]
+        return {
+            "search_images": self._should_search_images(message_lower),
+            "animals": animals,
+            "search_query": self._build_search_query(message_lower, animals)
+        }
+
+    def _should_search_images(self, message: str) -> bool:
+        for keyword in self.image_keywords:
+            if keyword in message:
+                return True
+        for animal in self.animal_keywords:
+            if animal in message:
+                if any(w in message for w in ['show', 'see', 'picture', 'photo', 'image']):
+                    return True
+        return False
+
+    def _build_search_query(self, message: str, animals: list) -> Optional[str]:
+        if animals:
+            return " ".join(animals)
+        for keyword in self.image_keywords:
+            if keyword in message:
+                words = message.split()
+                try:
+                    idx = words.index(keyword)
+                    if idx + 1 < len(words):
+                        return " ".join(words[idx + 1:idx + 4])
+                except ValueError:
+                    continue
+        return None
+
+
+def synthetic_animals(count: int) -> list[str]:
+    return [f"species{i:05d}" for i in range(count)]
+
+
+def run(label: str, router, number: int) -> float:
+    def work():
+        for message in MESSAGES:
+            router.analyze_intent(message)
+
+    seconds = min(timeit.repeat(work, number=number, repeat=5))
+    per_message_us = seconds / (number * len(MESSAGES)) * 1e6
+    print(f"  {label:<12} {per_message_us:10.2f} µs/message")
+    return per_message_us
+
+
+def main():
+    print("=" * 60)
+    print("MessageRouter.analyze_intent micro-benchmark")
+    print("=" * 60)
+
+    for extra in (0, 100, 1000, 5000):
+        animals = MessageRouter.ANIMAL_KEYWORDS + synthetic_animals(extra)
+        images = MessageRouter.IMAGE_KEYWORDS
+
+        compiled = MessageRouter()
+        compiled.load_keywords(image_keywords=images, animal_keywords=animals)
+        legacy = SubstringRouter(images, animals)
+
+        number = 2000 if extra < 1000 else 200
+        print(f"\n{len(animals) + len(images)} keywords:")
+        old = run("substring", legacy, number)
+        new = run("compiled", compiled, number)
+        print(f"  speedup      {old / new:10.1f}x")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
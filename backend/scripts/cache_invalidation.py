@@ -0,0 +1,37 @@
+"""
+Helper for telling a running backend that the wildlife-images index changed,
+so its in-process image search cache is dropped instead of serving stale hits.
+"""
+
+import httpx
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BACKEND_URL = os.getenv("BACKEND_URL", "").rstrip('/')
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+async def invalidate_backend_image_cache() -> bool:
+    """Invalidate the backend image cache. Skipped when BACKEND_URL is not set."""
+    if not BACKEND_URL:
+        print("ℹ BACKEND_URL not set, skipping backend image cache invalidation")
+        return False
+
+    url = f"{BACKEND_URL}/admin/cache/images/invalidate"
+    headers = {"X-Admin-Token": ADMIN_TOKEN}
+
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        try:
+            response = await client.post(url, headers=headers)
+            if response.status_code == 200:
+                dropped = response.json().get("entries_dropped", 0)
+                print(f"✓ Invalidated backend image cache ({dropped} entries dropped)")
+                return True
+            else:
+                print(f"⚠ Backend cache invalidation failed: {response.status_code} - {response.text}")
+                return False
+        except Exception as e:
+            print(f"⚠ Could not reach backend for cache invalidation: {e}")
+            return False
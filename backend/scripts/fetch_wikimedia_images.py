@@ -5,79 +5,20 @@ Uses the MediaWiki API to search for species-specific photos.
 
 import asyncio
 import httpx
-from typing import Optional, List, Dict
+from typing import List, Dict
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.wikimedia import WikimediaResolver
+
 load_dotenv()
 
-WIKIMEDIA_API_URL = "https://commons.wikimedia.org/w/api.php"
 SUPABASE_URL = os.getenv("SUPABASE_URL", "").rstrip('/')
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 
 
-async def search_wikimedia_image(species_name: str) -> Optional[str]:
-    """
-    Search for an image on Wikimedia Commons by scientific name.
-    Returns the URL of the first suitable image found.
-    """
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # First, try to find images in a category matching the scientific name
-        params = {
-            "action": "query",
-            "generator": "categorymembers",
-            "gcmtitle": f"Category:{species_name}",
-            "gcmlimit": "5",
-            "gcmtype": "file",
-            "prop": "imageinfo",
-            "iiprop": "url|size|mime",
-            "iiurlwidth": "800",
-            "format": "json"
-        }
-
-        try:
-            response = await client.get(WIKIMEDIA_API_URL, params=params)
-            data = response.json()
-
-            # Check if we got results from category
-            if "query" in data and "pages" in data["query"]:
-                for page in data["query"]["pages"].values():
-                    if "imageinfo" in page:
-                        image_info = page["imageinfo"][0]
-                        # Filter for JPEG/PNG images
-                        if image_info.get("mime") in ["image/jpeg", "image/png"]:
-                            return image_info.get("url")
-
-            # If category search fails, try searching by title
-            search_params = {
-                "action": "query",
-                "generator": "search",
-                "gsrsearch": f"File:{species_name}",
-                "gsrlimit": "5",
-                "gsrnamespace": "6",  # File namespace
-                "prop": "imageinfo",
-                "iiprop": "url|size|mime",
-                "iiurlwidth": "800",
-                "format": "json"
-            }
-
-            response = await client.get(WIKIMEDIA_API_URL, params=search_params)
-            data = response.json()
-
-            if "query" in data and "pages" in data["query"]:
-                for page in data["query"]["pages"].values():
-                    if "imageinfo" in page:
-                        image_info = page["imageinfo"][0]
-                        if image_info.get("mime") in ["image/jpeg", "image/png"]:
-                            return image_info.get("url")
-
-            return None
-
-        except Exception as e:
-            print(f"✗ Error searching Wikimedia for {species_name}: {e}")
-            return None
-
-
 async def get_species_from_supabase() -> List[Dict]:
     """Fetch all species from Supabase wildlife_species table."""
     url = f"{SUPABASE_URL}/rest/v1/wildlife_species?select=id,scientific_name,common_name"
@@ -133,6 +74,13 @@ async def main():
 
     print(f"Found {len(species_list)} species\n")
 
+    print("Searching Wikimedia Commons...")
+    async with WikimediaResolver() as wikimedia:
+        image_urls = await wikimedia.resolve_many(
+            species["scientific_name"] for species in species_list if species.get("scientific_name")
+        )
+    print(f"Resolved {len(image_urls)} species ({wikimedia.summary()})\n")
+
     success_count = 0
     failed_count = 0
 
@@ -144,7 +92,7 @@ async def main():
             continue
 
         print(f"Searching for {common_name} ({scientific_name})...")
-        image_url = await search_wikimedia_image(scientific_name)
+        image_url = image_urls.get(scientific_name)
 
         if image_url:
             success = await update_wildlife_image(scientific_name, common_name, image_url)
@@ -156,9 +104,6 @@ async def main():
             print(f"  ✗ No image found for {common_name}")
             failed_count += 1
 
-        # Be nice to Wikimedia API
-        await asyncio.sleep(0.5)
-
     print(f"\n{'='*50}")
     print(f"✓ Successfully updated: {success_count} species")
     print(f"✗ Failed or not found: {failed_count} species")
@@ -6,10 +6,15 @@ Only saves images when a species-specific Wikimedia photo is found.
 
 import asyncio
 import httpx
-from typing import List, Dict, Optional
+from typing import List, Dict
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.cache_invalidation import invalidate_backend_image_cache
+from scripts.wikimedia import WikimediaResolver
+
 load_dotenv()
 
 ELASTIC_CLOUD_URL = os.getenv("ELASTIC_CLOUD_URL", "").rstrip('/')
@@ -18,7 +23,6 @@ WILDLIFE_IMAGE_INDEX = os.getenv("WILDLIFE_IMAGE_INDEX", "wildlife-images")
 SUPABASE_URL = os.getenv("SUPABASE_URL", "").rstrip('/')
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY", "")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
-WIKIMEDIA_API_URL = "https://commons.wikimedia.org/w/api.php"
 
 # Spanish to English common name mapping for species
 ENGLISH_NAMES = {
@@ -145,7 +149,11 @@ async def create_index():
             response = await client.put(url, headers=headers, json=mapping)
             if response.status_code in [200, 201]:
                 print(f"✓ Index '{WILDLIFE_IMAGE_INDEX}' created successfully")
-            elif response.status_code == 400 and "resource_already_exists" in response.text:
+            elif response.status_code == 400 and (
+                "resource_already_exists" in response.text
+                # sync_wildlife_images.py serves the index through an alias
+                or "invalid_index_name_exception" in response.text
+            ):
                 print(f"✓ Index '{WILDLIFE_IMAGE_INDEX}' already exists")
             else:
                 print(f"✗ Failed to create index: {response.status_code} - {response.text}")
@@ -197,75 +205,6 @@ async def index_document(doc: Dict):
             return False
 
 
-async def search_wikimedia_image(species_name: str, common_name: str) -> Optional[str]:
-    """
-    Search for an image on Wikimedia Commons by scientific name.
-    Returns the URL of the first suitable image found, or None if no specific image is available.
-    """
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # Try to find images in a category matching the scientific name
-        params = {
-            "action": "query",
-            "generator": "categorymembers",
-            "gcmtitle": f"Category:{species_name}",
-            "gcmlimit": "10",
-            "gcmtype": "file",
-            "prop": "imageinfo",
-            "iiprop": "url|size|mime|extmetadata",
-            "iiurlwidth": "800",
-            "format": "json"
-        }
-
-        try:
-            response = await client.get(WIKIMEDIA_API_URL, params=params)
-            data = response.json()
-
-            if "query" in data and "pages" in data["query"]:
-                for page in data["query"]["pages"].values():
-                    if "imageinfo" in page:
-                        image_info = page["imageinfo"][0]
-                        image_url = image_info.get("url", "")
-
-                        # Check if it's a valid image type
-                        if image_info.get("mime") not in ["image/jpeg", "image/png"]:
-                            continue
-
-                        return image_url
-
-            # If category search fails, try searching by title with scientific name
-            search_params = {
-                "action": "query",
-                "generator": "search",
-                "gsrsearch": f"File:{species_name}",
-                "gsrlimit": "10",
-                "gsrnamespace": "6",
-                "prop": "imageinfo",
-                "iiprop": "url|size|mime",
-                "iiurlwidth": "800",
-                "format": "json"
-            }
-
-            response = await client.get(WIKIMEDIA_API_URL, params=search_params)
-            data = response.json()
-
-            if "query" in data and "pages" in data["query"]:
-                for page in data["query"]["pages"].values():
-                    if "imageinfo" in page:
-                        image_info = page["imageinfo"][0]
-                        image_url = image_info.get("url", "")
-
-                        if image_info.get("mime") not in ["image/jpeg", "image/png"]:
-                            continue
-
-                        return image_url
-
-            return None
-
-        except Exception as e:
-            print(f"  ⚠ Wikimedia search error: {e}")
-            return None
-
-
 async def get_species_from_supabase() -> List[Dict]:
     """Fetch all species from Supabase wildlife_species table."""
     url = f"{SUPABASE_URL}/rest/v1/wildlife_species?select=id,scientific_name,common_name,conservation_status,category"
@@ -318,7 +257,12 @@ async def populate_wildlife_images():
         return
 
     print(f"✓ Found {len(species_list)} species\n")
-    print("Fetching images from Wikimedia Commons...\n")
+    print("Fetching images from Wikimedia Commons...")
+    async with WikimediaResolver() as wikimedia:
+        image_urls = await wikimedia.resolve_many(
+            species["scientific_name"] for species in species_list if species.get("scientific_name")
+        )
+    print(f"✓ Resolved {len(image_urls)} species ({wikimedia.summary()})\n")
 
     success_count = 0
     skipped_count = 0
@@ -334,7 +278,7 @@ async def populate_wildlife_images():
         print(f"Processing {common_name} ({scientific_name})...")
 
         # Try to get image from Wikimedia
-        wikimedia_url = await search_wikimedia_image(scientific_name, common_name)
+        wikimedia_url = image_urls.get(scientific_name)
 
         if wikimedia_url:
             english_name = ENGLISH_NAMES.get(common_name, common_name)
@@ -365,15 +309,17 @@ async def populate_wildlife_images():
             skipped_count += 1
             print(f"  ✗ No suitable Wikimedia image found (skipping generic stock photos)")
 
-        # Be nice to Wikimedia API
-        await asyncio.sleep(0.5)
-
     print("\n" + "=" * 70)
     print("Summary:")
     print(f"  ✓ Successfully saved: {success_count}")
     print(f"  ✗ Skipped (no specific image): {skipped_count}")
     print(f"  Total processed: {len(species_list)}")
     print("=" * 70)
+
+    if success_count:
+        print()
+        await invalidate_backend_image_cache()
+
     print("\nNote: Only species with specific Wikimedia images were saved.")
     print("Generic stock photos were skipped to ensure accuracy.")
 
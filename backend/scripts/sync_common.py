@@ -0,0 +1,328 @@
+"""
+Shared helpers for incremental Supabase → Elasticsearch syncs.
+
+A checkpoint per table records the latest `updated_at` that has been
+indexed and the set of ids present at that time. An incremental
+run then:
+
+1. fetches only rows changed since the checkpoint, in keyset order
+   (`updated_at`, `id`), starting SYNC_OVERLAP_SECONDS before it so rows
+   committed late with a slightly older timestamp are not missed,
+2. fetches the current id list (`select=id`) and diffs it against the
+   checkpoint to find deleted rows,
+3. upserts and deletes those documents through the bulk indexer, and
+4. advances the checkpoint only when every bulk action succeeded.
+
+Re-indexing a row twice is harmless, so the overlap only costs a few
+redundant documents. `updated_at` must be maintained on every update
+(e.g. by a trigger) for changes to be picked up.
+
+Full and incremental syncs both stream: rows are read one PostgREST page
+at a time (keyset pagination, SYNC_PAGE_SIZE rows) and encoded straight
+into `_bulk` batches capped at SYNC_BULK_MAX_BYTES, with at most
+SYNC_BULK_CONCURRENCY batches in flight. Memory stays flat however large
+the table is; only the id list kept for delete detection grows with it.
+"""
+
+import asyncio
+import json
+import os
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+STATE_DIR = os.getenv("SYNC_STATE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".sync_state"
+)
+OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP_SECONDS") or "5")
+PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE") or "1000")
+BULK_MAX_BYTES = int(os.getenv("SYNC_BULK_MAX_BYTES") or str(5 * 1024 * 1024))
+BULK_CONCURRENCY = int(os.getenv("SYNC_BULK_CONCURRENCY") or "2")
+
+
+@dataclass
+class Checkpoint:
+    updated_at: Optional[str] = None
+    ids: List[str] = field(default_factory=list)
+
+    def observe(self, row: Dict):
+        """Record a synced row: its id, and its updated_at if newest."""
+        self.ids.append(str(row["id"]))
+        updated_at = row.get("updated_at")
+        if updated_at and updated_at > (self.updated_at or ""):
+            self.updated_at = updated_at
+
+
+def load_checkpoint(name: str) -> Optional[Checkpoint]:
+    path = os.path.join(STATE_DIR, f"{name}.json")
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    # Older checkpoints also stored the id of the newest row
+    known = {item.name for item in fields(Checkpoint)}
+    return Checkpoint(**{key: value for key, value in state.items() if key in known})
+
+
+def save_checkpoint(name: str, checkpoint: Checkpoint):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = os.path.join(STATE_DIR, f"{name}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(asdict(checkpoint), f)
+    os.replace(tmp, path)
+
+
+def _lower_bound(updated_at: str) -> str:
+    return (datetime.fromisoformat(updated_at) - timedelta(seconds=OVERLAP_SECONDS)).isoformat()
+
+
+async def _stream_pages(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Dict[str, str],
+    params: Dict[str, str],
+    next_params
+) -> AsyncIterator[Dict]:
+    """Yield rows one page at a time; `next_params(last_row)` gives the
+    filter for the page after `last_row`.
+
+    Paging stops at the first empty page, not the first short one: PostgREST
+    caps pages at its max-rows setting (1000 on Supabase), so a page smaller
+    than PAGE_SIZE does not mean the table has been read.
+    """
+    page_params = params
+    while True:
+        response = await client.get(url, headers=headers, params={**page_params, "limit": str(PAGE_SIZE)})
+        response.raise_for_status()
+        page = response.json()
+        if not page:
+            return
+        for row in page:
+            yield row
+        page_params = {**params, **next_params(page[-1])}
+
+
+def stream_rows(
+    client: httpx.AsyncClient,
+    base_url: str,
+    table: str,
+    headers: Dict[str, str]
+) -> AsyncIterator[Dict]:
+    """Every row of `table`, paged by id."""
+    return _stream_pages(
+        client,
+        f"{base_url}/rest/v1/{table}",
+        headers,
+        {"select": "*", "order": "id.asc"},
+        lambda last: {"id": f"gt.{last['id']}"}
+    )
+
+
+def stream_changed_rows(
+    client: httpx.AsyncClient,
+    base_url: str,
+    table: str,
+    headers: Dict[str, str],
+    since: Optional[str]
+) -> AsyncIterator[Dict]:
+    """Rows with `updated_at` at or after `since`, paged by (updated_at, id)."""
+    params = {"select": "*", "order": "updated_at.asc,id.asc"}
+    if since:
+        params["updated_at"] = f"gte.{_lower_bound(since)}"
+
+    def after(last: Dict) -> Dict[str, str]:
+        updated_at, row_id = last["updated_at"], last["id"]
+        return {"or": f'(updated_at.gt."{updated_at}",and(updated_at.eq."{updated_at}",id.gt."{row_id}"))'}
+
+    return _stream_pages(client, f"{base_url}/rest/v1/{table}", headers, params, after)
+
+
+async def peek(rows: AsyncIterator[Dict]) -> Tuple[Optional[Dict], AsyncIterator[Dict]]:
+    """The first row (None if there are none) and an iterator still yielding it."""
+    first = await anext(rows, None)
+
+    async def chained():
+        if first is None:
+            return
+        yield first
+        async for row in rows:
+            yield row
+
+    return first, chained()
+
+
+async def count_rows(client: httpx.AsyncClient, base_url: str, table: str, headers: Dict[str, str]) -> int:
+    """Exact row count of `table`, from PostgREST's Content-Range header."""
+    response = await client.head(
+        f"{base_url}/rest/v1/{table}",
+        headers={**headers, "Prefer": "count=exact"},
+        params={"select": "id"}
+    )
+    response.raise_for_status()
+    return int(response.headers["Content-Range"].rsplit("/", 1)[1])
+
+
+async def fetch_ids(client: httpx.AsyncClient, base_url: str, table: str, headers: Dict[str, str]) -> Set[str]:
+    """Every id currently in `table`, used to detect deletions."""
+    pages = _stream_pages(
+        client,
+        f"{base_url}/rest/v1/{table}",
+        headers,
+        {"select": "id", "order": "id.asc"},
+        lambda last: {"id": f"gt.{last['id']}"}
+    )
+    return {str(row["id"]) async for row in pages}
+
+
+class BulkIndexer:
+    """Streams index and delete actions into size-capped `_bulk` requests.
+
+    Actions are encoded to NDJSON as they are added and flushed once a
+    batch reaches `max_bytes`; up to `concurrency` batches are sent at
+    once, and adding more waits for one of them to finish. Use as an async
+    context manager so the last batch is flushed and awaited.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        elastic_url: str,
+        index: str,
+        api_key: str,
+        max_bytes: int = BULK_MAX_BYTES,
+        concurrency: int = BULK_CONCURRENCY
+    ):
+        self._client = client
+        self._url = f"{elastic_url}/{index}/_bulk"
+        self._headers = {"Authorization": f"ApiKey {api_key}", "Content-Type": "application/x-ndjson"}
+        self.max_bytes = max_bytes
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._batch = bytearray()
+        self._actions = 0
+
+        self.indexed = 0
+        self.deleted = 0
+        self.failed = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.failed == 0
+
+    async def index(self, doc: Dict[str, Any]):
+        action = json.dumps({"index": {"_id": str(doc["id"])}})
+        await self._add(f"{action}\n{json.dumps(doc)}\n".encode())
+
+    async def delete(self, doc_id: str):
+        await self._add((json.dumps({"delete": {"_id": doc_id}}) + "\n").encode())
+
+    async def _add(self, lines: bytes):
+        if self._batch and len(self._batch) + len(lines) > self.max_bytes:
+            await self.flush()
+        self._batch += lines
+        self._actions += 1
+
+    async def flush(self):
+        if not self._batch:
+            return
+        body, actions = bytes(self._batch), self._actions
+        self._batch = bytearray()
+        self._actions = 0
+
+        # Waiting for a free slot is what keeps memory bounded
+        await self._slots.acquire()
+        task = asyncio.create_task(self._send(body, actions))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, body: bytes, actions: int):
+        try:
+            response = await self._client.post(
+                self._url,
+                headers=self._headers,
+                content=body,
+                params={"filter_path": "errors,items.*.error,items.*.status"}
+            )
+            if response.status_code not in [200, 201]:
+                print(f"✗ Failed to bulk index: {response.status_code} - {response.text}")
+                self.failed += actions
+                return
+            self._count(response.json())
+        except Exception as e:
+            print(f"✗ Error indexing to Elasticsearch: {e}")
+            self.failed += actions
+        finally:
+            self._slots.release()
+
+    def _count(self, result: Dict[str, Any]):
+        for item in result.get("items", []):
+            for action, outcome in item.items():
+                if "error" in outcome and not (action == "delete" and outcome.get("status") == 404):
+                    print(f"  Error: {outcome['error']}")
+                    self.failed += 1
+                elif action == "delete":
+                    self.deleted += 1
+                else:
+                    self.indexed += 1
+
+    async def __aenter__(self) -> "BulkIndexer":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.flush()
+        await asyncio.gather(*list(self._tasks))
+
+
+async def sync_incremental(
+    name: str,
+    base_url: str,
+    table: str,
+    headers: Dict[str, str],
+    elastic_url: str,
+    index: str,
+    api_key: str
+) -> Optional[Tuple[int, int]]:
+    """Apply changes since the last checkpoint.
+
+    Returns (rows upserted, documents deleted), or None when the sync failed
+    and the checkpoint was left where it was.
+    """
+    checkpoint = load_checkpoint(name) or Checkpoint()
+    advanced = Checkpoint(checkpoint.updated_at)
+
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        bulk = BulkIndexer(client, elastic_url, index, api_key)
+        try:
+            async with bulk:
+                async for row in stream_changed_rows(client, base_url, table, headers, checkpoint.updated_at):
+                    advanced.observe(row)
+                    await bulk.index(row)
+
+                # Rows streamed as changed but gone from the id list were
+                # deleted in between and must not linger in the index either.
+                # Deletes are only derived from a complete id scan: counted
+                # first, so rows inserted meanwhile can only add to the scan
+                expected = await count_rows(client, base_url, table, headers)
+                current_ids = await fetch_ids(client, base_url, table, headers)
+                if len(current_ids) < expected:
+                    # Upserts already queued still go out; the checkpoint stays put
+                    print(f"✗ Read {len(current_ids)} of {expected} ids from Supabase; not deleting anything")
+                    return None
+                deleted = sorted((set(checkpoint.ids) | set(advanced.ids)) - current_ids)
+                for doc_id in deleted:
+                    await bulk.delete(doc_id)
+        except httpx.HTTPError as e:
+            print(f"✗ Error fetching changes from Supabase: {e}")
+            return None
+
+    if not bulk.ok:
+        return None
+
+    upserted = len(advanced.ids)
+    advanced.ids = sorted(current_ids)
+    save_checkpoint(name, advanced)
+    return upserted, len(deleted)
@@ -2,17 +2,22 @@
 Script to sync wildlife species from Supabase to Elasticsearch.
 This ensures data is available in Elasticsearch for the hackathon,
 while maintaining Supabase as the source of truth for future use.
+
+Rows are streamed from Supabase page by page into size-capped bulk
+requests (see sync_common), so memory use does not grow with the table.
 """
 
+import argparse
 import asyncio
 import httpx
 import os
-from typing import List, Dict
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 # Import Supabase client
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.sync_common import BulkIndexer, Checkpoint, load_checkpoint, save_checkpoint, stream_rows, sync_incremental
 
 load_dotenv()
 
@@ -24,27 +29,15 @@ SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY", "")
 ELASTIC_CLOUD_URL = os.getenv("ELASTIC_CLOUD_URL", "").rstrip('/')
 ELASTIC_API_KEY = os.getenv("ELASTIC_API_KEY", "")
 WILDLIFE_SPECIES_INDEX = "wildlife-species"
+CHECKPOINT_NAME = "wildlife_species"
 
 
-async def fetch_species_from_supabase() -> List[Dict]:
-    """Fetch all wildlife species from Supabase"""
-    url = f"{SUPABASE_URL}/rest/v1/wildlife_species?select=*"
-    headers = {
+def supabase_headers() -> Dict[str, str]:
+    return {
         "apikey": SUPABASE_ANON_KEY,
         "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            species = response.json()
-            print(f"✓ Fetched {len(species)} species from Supabase")
-            return species
-        except Exception as e:
-            print(f"✗ Error fetching from Supabase: {e}")
-            return []
-
 
 async def create_elasticsearch_index():
     """Create the wildlife species index in Elasticsearch with proper mappings"""
@@ -94,48 +87,68 @@ async def create_elasticsearch_index():
             return False
 
 
-async def index_species_to_elasticsearch(species: List[Dict]):
-    """Index all species to Elasticsearch"""
-    url = f"{ELASTIC_CLOUD_URL}/{WILDLIFE_SPECIES_INDEX}/_bulk"
-    headers = {
-        "Authorization": f"ApiKey {ELASTIC_API_KEY}",
-        "Content-Type": "application/x-ndjson"
-    }
-
-    # Build bulk request (newline-delimited JSON)
-    bulk_data = []
-    for sp in species:
-        # Index action
-        bulk_data.append('{"index": {"_id": "' + sp['id'] + '"}}')
-        # Document
-        import json
-        bulk_data.append(json.dumps(sp))
-
-    bulk_body = "\n".join(bulk_data) + "\n"
+async def index_species_to_elasticsearch(checkpoint: Checkpoint, categories: Dict[str, int]) -> Optional[bool]:
+    """Stream all species from Supabase into Elasticsearch
 
+    Returns None when Supabase has no species, otherwise whether every
+    document was indexed.
+    """
     async with httpx.AsyncClient(timeout=60.0) as client:
+        bulk = BulkIndexer(client, ELASTIC_CLOUD_URL, WILDLIFE_SPECIES_INDEX, ELASTIC_API_KEY)
         try:
-            response = await client.post(url, headers=headers, content=bulk_body)
-            if response.status_code in [200, 201]:
-                result = response.json()
-                if result.get("errors"):
-                    print(f"⚠ Some documents failed to index")
-                    for item in result.get("items", []):
-                        if "error" in item.get("index", {}):
-                            print(f"  Error: {item['index']['error']}")
-                else:
-                    print(f"✓ Successfully indexed {len(species)} species to Elasticsearch")
-                return True
-            else:
-                print(f"✗ Failed to bulk index: {response.status_code} - {response.text}")
-                return False
-        except Exception as e:
-            print(f"✗ Error indexing to Elasticsearch: {e}")
+            async with bulk:
+                async for sp in stream_rows(client, SUPABASE_URL.rstrip('/'), "wildlife_species", supabase_headers()):
+                    checkpoint.observe(sp)
+                    cat = sp.get('category', 'unknown')
+                    categories[cat] = categories.get(cat, 0) + 1
+                    await bulk.index(sp)
+        except httpx.HTTPError as e:
+            print(f"✗ Error fetching from Supabase: {e}")
             return False
 
+    if not checkpoint.ids:
+        return None
+    if not bulk.ok:
+        print(f"⚠ {bulk.failed} documents failed to index")
+        return False
+    print(f"✓ Successfully indexed {bulk.indexed} species to Elasticsearch")
+    return True
+
 
-async def sync_species():
+async def sync_species_incremental() -> bool:
+    """Apply only rows changed or deleted since the last sync"""
+    print("=" * 60)
+    print("Wildlife Species Incremental Sync: Supabase → Elasticsearch")
+    print("=" * 60)
+
+    result = await sync_incremental(
+        CHECKPOINT_NAME,
+        SUPABASE_URL.rstrip('/'),
+        "wildlife_species",
+        supabase_headers(),
+        ELASTIC_CLOUD_URL,
+        WILDLIFE_SPECIES_INDEX,
+        ELASTIC_API_KEY
+    )
+    if result is None:
+        print("✗ Incremental sync failed; checkpoint unchanged")
+        print("=" * 60)
+        return False
+
+    upserted, deleted = result
+    print(f"✓ {upserted} species indexed, {deleted} deleted")
+    print("=" * 60)
+    return True
+
+
+async def sync_species(incremental: bool = False):
     """Main sync function"""
+    if incremental:
+        if load_checkpoint(CHECKPOINT_NAME):
+            await sync_species_incremental()
+            return
+        print("ℹ No checkpoint yet, running a full sync first")
+
     print("=" * 60)
     print("Wildlife Species Sync: Supabase → Elasticsearch")
     print("=" * 60)
@@ -144,19 +157,8 @@ async def sync_species():
     print("Post-hackathon: Will switch to Supabase as primary.")
     print()
 
-    # Step 1: Fetch from Supabase
-    print("[1/3] Fetching species from Supabase...")
-    species = await fetch_species_from_supabase()
-
-    if not species:
-        print("✗ No species found in Supabase. Aborting sync.")
-        return
-
-    print(f"      Found {len(species)} species")
-    print()
-
-    # Step 2: Create Elasticsearch index
-    print("[2/3] Creating/verifying Elasticsearch index...")
+    # Step 1: Create Elasticsearch index
+    print("[1/2] Creating/verifying Elasticsearch index...")
     success = await create_elasticsearch_index()
 
     if not success:
@@ -165,9 +167,15 @@ async def sync_species():
 
     print()
 
-    # Step 3: Sync to Elasticsearch
-    print("[3/3] Syncing species to Elasticsearch...")
-    success = await index_species_to_elasticsearch(species)
+    # Step 2: Stream species from Supabase to Elasticsearch
+    print("[2/2] Syncing species to Elasticsearch...")
+    checkpoint = Checkpoint()
+    categories: Dict[str, int] = {}
+    success = await index_species_to_elasticsearch(checkpoint, categories)
+
+    if success is None:
+        print("✗ No species found in Supabase. Aborting sync.")
+        return
 
     print()
     print("=" * 60)
@@ -176,17 +184,15 @@ async def sync_species():
         print("✓ Sync completed successfully!")
         print()
         print(f"Summary:")
-        print(f"  - Total species synced: {len(species)}")
-
-        # Count by category
-        categories = {}
-        for sp in species:
-            cat = sp.get('category', 'unknown')
-            categories[cat] = categories.get(cat, 0) + 1
+        print(f"  - Total species synced: {len(checkpoint.ids)}")
 
         print(f"  - By category:")
         for cat, count in sorted(categories.items()):
             print(f"    • {cat}: {count}")
+
+        # Later --incremental runs pick up from this sync
+        checkpoint.ids.sort()
+        save_checkpoint(CHECKPOINT_NAME, checkpoint)
     else:
         print("✗ Sync failed!")
 
@@ -194,4 +200,8 @@ async def sync_species():
 
 
 if __name__ == "__main__":
-    asyncio.run(sync_species())
+    parser = argparse.ArgumentParser(description="Sync wildlife species from Supabase to Elasticsearch")
+    parser.add_argument("--incremental", action="store_true", help="Only sync rows changed or deleted since the last run")
+    args = parser.parse_args()
+
+    asyncio.run(sync_species(incremental=args.incremental))
@@ -1,13 +1,38 @@
 """
 Script to sync wildlife images from Supabase to Elasticsearch.
+
+By default the sync is blue/green: images are loaded into a new versioned
+index (`wildlife-images-v<timestamp>`) and the `wildlife-images` alias is
+switched to it atomically once it is ready, so searches never see an empty
+or missing index. Older versions are deleted afterwards, keeping `--keep`
+of them for rollback. `--in-place` restores the previous behaviour of
+deleting and recreating the index.
+
+Rows are streamed from Supabase page by page into size-capped bulk
+requests (see sync_common), so memory use does not grow with the table.
 """
 
+import argparse
 import asyncio
 import httpx
 import os
-from typing import List, Dict
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Dict, Optional
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.cache_invalidation import invalidate_backend_image_cache
+from scripts.sync_common import (
+    BulkIndexer,
+    Checkpoint,
+    load_checkpoint,
+    peek,
+    save_checkpoint,
+    stream_rows,
+    sync_incremental,
+)
+
 load_dotenv()
 
 # Supabase configuration
@@ -17,64 +42,69 @@ SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 # Elasticsearch configuration
 ELASTIC_CLOUD_URL = os.getenv("ELASTIC_CLOUD_URL", "").rstrip('/')
 ELASTIC_API_KEY = os.getenv("ELASTIC_API_KEY", "")
+# Name the backend searches; an alias in blue/green mode
 WILDLIFE_IMAGE_INDEX = "wildlife-images"
+CHECKPOINT_NAME = "wildlife_images"
+
+INDEX_MAPPING = {
+    "properties": {
+        "id": {"type": "keyword"},
+        "photo_image_url": {"type": "keyword"},
+        "photo_description": {"type": "text"},
+        "species_name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+        "common_name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+        "english_name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+        "natural_description": {"type": "text"},
+        "location": {"type": "text"},
+        "conservation_status": {"type": "keyword"},
+        "created_at": {"type": "date"},
+        "updated_at": {"type": "date"}
+    }
+}
 
 
-async def fetch_images_from_supabase() -> List[Dict]:
-    """Fetch all wildlife images from Supabase"""
-    url = f"{SUPABASE_URL}/rest/v1/wildlife_images?select=*"
-    headers = {
+def supabase_headers() -> Dict[str, str]:
+    return {
         "apikey": SUPABASE_SERVICE_ROLE_KEY,
         "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            images = response.json()
-            print(f"✓ Fetched {len(images)} images from Supabase")
-            return images
-        except Exception as e:
-            print(f"✗ Error fetching from Supabase: {e}")
-            return []
-
 
-async def create_elasticsearch_index():
-    """Create the wildlife images index in Elasticsearch with proper mappings"""
-    url = f"{ELASTIC_CLOUD_URL}/{WILDLIFE_IMAGE_INDEX}"
-    headers = {
+def elastic_headers(content_type: str = "application/json") -> Dict[str, str]:
+    return {
         "Authorization": f"ApiKey {ELASTIC_API_KEY}",
-        "Content-Type": "application/json"
+        "Content-Type": content_type
     }
 
-    mapping = {
-        "mappings": {
-            "properties": {
-                "id": {"type": "keyword"},
-                "photo_image_url": {"type": "keyword"},
-                "photo_description": {"type": "text"},
-                "species_name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-                "common_name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-                "english_name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-                "natural_description": {"type": "text"},
-                "location": {"type": "text"},
-                "conservation_status": {"type": "keyword"},
-                "created_at": {"type": "date"},
-                "updated_at": {"type": "date"}
-            }
-        }
-    }
+
+async def track_images(images: AsyncIterator[Dict], checkpoint: Checkpoint, samples: Dict[str, str]):
+    """Pass images through, recording them for the checkpoint and summary"""
+    async for img in images:
+        checkpoint.observe(img)
+        if len(samples) < 5:
+            samples.setdefault(img.get('common_name', 'Unknown'), img.get('species_name', 'N/A'))
+        yield img
+
+
+async def create_elasticsearch_index():
+    """Delete and recreate the wildlife images index (--in-place mode)"""
+    url = f"{ELASTIC_CLOUD_URL}/{WILDLIFE_IMAGE_INDEX}"
+    headers = elastic_headers()
 
     async with httpx.AsyncClient() as client:
         try:
+            aliased = await client.get(f"{ELASTIC_CLOUD_URL}/_alias/{WILDLIFE_IMAGE_INDEX}", headers=headers)
+            if aliased.status_code == 200:
+                print(f"✗ '{WILDLIFE_IMAGE_INDEX}' is an alias; run without --in-place")
+                return False
+
             # Delete existing index first
             delete_response = await client.delete(url, headers=headers)
             if delete_response.status_code in [200, 404]:
                 print(f"✓ Cleared existing index")
 
             # Create new index
-            response = await client.put(url, headers=headers, json=mapping)
+            response = await client.put(url, headers=headers, json={"mappings": INDEX_MAPPING})
             if response.status_code in [200, 201]:
                 print(f"✓ Index '{WILDLIFE_IMAGE_INDEX}' created successfully")
                 return True
@@ -86,77 +116,248 @@ async def create_elasticsearch_index():
             return False
 
 
-async def index_images_to_elasticsearch(images: List[Dict]):
-    """Index all images to Elasticsearch"""
-    url = f"{ELASTIC_CLOUD_URL}/{WILDLIFE_IMAGE_INDEX}/_bulk"
-    headers = {
-        "Authorization": f"ApiKey {ELASTIC_API_KEY}",
-        "Content-Type": "application/x-ndjson"
+async def create_versioned_index(client: httpx.AsyncClient) -> Optional[str]:
+    """Create a new `wildlife-images-v<timestamp>` index tuned for bulk loading"""
+    index = f"{WILDLIFE_IMAGE_INDEX}-v{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
+    body = {
+        # No replicas to copy to and no refreshes while the bulk load runs;
+        # both are restored before the index goes live
+        "settings": {"index": {"number_of_replicas": 0, "refresh_interval": "-1"}},
+        "mappings": INDEX_MAPPING
     }
 
-    # Build bulk request (newline-delimited JSON)
-    bulk_data = []
-    for img in images:
-        # Index action
-        bulk_data.append('{"index": {"_id": "' + img['id'] + '"}}')
-        # Document
-        import json
-        bulk_data.append(json.dumps(img))
+    try:
+        response = await client.put(f"{ELASTIC_CLOUD_URL}/{index}", headers=elastic_headers(), json=body)
+        if response.status_code in [200, 201]:
+            print(f"✓ Index '{index}' created")
+            return index
+        print(f"✗ Failed to create index: {response.status_code} - {response.text}")
+    except Exception as e:
+        print(f"✗ Error creating index: {e}")
+    return None
+
+
+async def get_alias_targets(client: httpx.AsyncClient) -> Optional[List[str]]:
+    """Indices the alias points to, [] for a legacy concrete index, None if absent"""
+    response = await client.get(f"{ELASTIC_CLOUD_URL}/_alias/{WILDLIFE_IMAGE_INDEX}", headers=elastic_headers())
+    if response.status_code == 200:
+        return list(response.json().keys())
+
+    response = await client.head(f"{ELASTIC_CLOUD_URL}/{WILDLIFE_IMAGE_INDEX}", headers=elastic_headers())
+    return [] if response.status_code == 200 else None
+
+
+async def get_replica_count(client: httpx.AsyncClient, index: str) -> int:
+    """Replica count of the index currently serving searches (1 if unknown)"""
+    try:
+        response = await client.get(
+            f"{ELASTIC_CLOUD_URL}/{index}/_settings/index.number_of_replicas",
+            headers=elastic_headers()
+        )
+        response.raise_for_status()
+        for settings in response.json().values():
+            return int(settings["settings"]["index"]["number_of_replicas"])
+    except Exception:
+        pass
+    return 1
+
+
+async def finalize_index(client: httpx.AsyncClient, index: str, replicas: int, expected: int) -> bool:
+    """Restore replicas and refresh, then check every document is searchable"""
+    url = f"{ELASTIC_CLOUD_URL}/{index}"
+    headers = elastic_headers()
+
+    response = await client.put(
+        f"{url}/_settings",
+        headers=headers,
+        json={"index": {"number_of_replicas": replicas, "refresh_interval": None}}
+    )
+    if response.status_code != 200:
+        # Serverless projects manage replicas and refresh themselves
+        print(f"⚠ Could not restore index settings: {response.status_code} - {response.text}")
+
+    await client.post(f"{url}/_refresh", headers=headers)
+
+    health = await client.get(
+        f"{ELASTIC_CLOUD_URL}/_cluster/health/{index}",
+        headers=headers,
+        params={"wait_for_status": "green" if replicas else "yellow", "timeout": "60s"}
+    )
+    if health.status_code != 200 or health.json().get("timed_out"):
+        print(f"⚠ Index '{index}' did not reach full replication in time; continuing")
+
+    count = await client.get(f"{url}/_count", headers=headers)
+    count.raise_for_status()
+    indexed = count.json().get("count", 0)
+    if indexed < expected:
+        print(f"✗ Index '{index}' has {indexed} of {expected} documents")
+        return False
+
+    print(f"✓ Index '{index}' ready with {indexed} documents ({replicas} replicas)")
+    return True
+
+
+async def swap_alias(client: httpx.AsyncClient, index: str, current: Optional[List[str]]) -> bool:
+    """Point the alias at `index` in a single atomic `_aliases` request"""
+    if current is None:
+        actions = []
+    elif not current:
+        # A concrete index still owns the name: drop it in the same request
+        # that creates the alias, so there is no moment without one
+        actions = [{"remove_index": {"index": WILDLIFE_IMAGE_INDEX}}]
+    else:
+        actions = [{"remove": {"index": old, "alias": WILDLIFE_IMAGE_INDEX}} for old in current]
+    actions.append({"add": {"index": index, "alias": WILDLIFE_IMAGE_INDEX, "is_write_index": True}})
+
+    response = await client.post(f"{ELASTIC_CLOUD_URL}/_aliases", headers=elastic_headers(), json={"actions": actions})
+    if response.status_code == 200:
+        print(f"✓ Alias '{WILDLIFE_IMAGE_INDEX}' now points to '{index}'")
+        return True
+    print(f"✗ Failed to swap alias: {response.status_code} - {response.text}")
+    return False
+
+
+async def cleanup_old_versions(client: httpx.AsyncClient, live_index: str, keep: int):
+    """Delete versioned indices older than the live one, keeping `keep` for rollback"""
+    response = await client.get(
+        f"{ELASTIC_CLOUD_URL}/_resolve/index/{WILDLIFE_IMAGE_INDEX}-v*",
+        headers=elastic_headers()
+    )
+    if response.status_code != 200:
+        print(f"⚠ Could not list old index versions: {response.status_code}")
+        return
 
-    bulk_body = "\n".join(bulk_data) + "\n"
+    # Timestamped names sort chronologically
+    versions = sorted(i["name"] for i in response.json().get("indices", []) if i["name"] < live_index)
+    stale = versions[:-keep] if keep > 0 else versions
+    for index in stale:
+        delete = await client.delete(f"{ELASTIC_CLOUD_URL}/{index}", headers=elastic_headers())
+        if delete.status_code == 200:
+            print(f"✓ Deleted old index '{index}'")
+        else:
+            print(f"⚠ Could not delete '{index}': {delete.status_code}")
+
+
+async def index_images_to_elasticsearch(
+    client: httpx.AsyncClient,
+    images: AsyncIterator[Dict],
+    index: str = WILDLIFE_IMAGE_INDEX
+) -> Optional[int]:
+    """Stream images into the index; returns how many were indexed, or None on failure"""
+    bulk = BulkIndexer(client, ELASTIC_CLOUD_URL, index, ELASTIC_API_KEY)
+    try:
+        async with bulk:
+            async for img in images:
+                await bulk.index(img)
+    except httpx.HTTPError as e:
+        print(f"✗ Error fetching from Supabase: {e}")
+        return None
+
+    if not bulk.ok:
+        print(f"⚠ {bulk.failed} documents failed to index")
+        return None
+    print(f"✓ Successfully indexed {bulk.indexed} images to Elasticsearch")
+    return bulk.indexed
+
+
+async def reindex_blue_green(client: httpx.AsyncClient, images: AsyncIterator[Dict], keep: int) -> bool:
+    """Load a new versioned index and switch the alias to it"""
+    current = await get_alias_targets(client)
+    replicas = await get_replica_count(client, WILDLIFE_IMAGE_INDEX) if current is not None else 1
+
+    index = await create_versioned_index(client)
+    if not index:
+        return False
+
+    loaded = await index_images_to_elasticsearch(client, images, index=index)
+    if loaded is None or not await finalize_index(client, index, replicas, loaded):
+        # The alias still points at the previous version, so searches are unaffected
+        await client.delete(f"{ELASTIC_CLOUD_URL}/{index}", headers=elastic_headers())
+        print(f"✗ Discarded '{index}'; '{WILDLIFE_IMAGE_INDEX}' is unchanged")
+        return False
+
+    if not await swap_alias(client, index, current):
+        return False
+
+    await cleanup_old_versions(client, index, keep)
+    return True
+
+
+async def reindex_in_place(client: httpx.AsyncClient, images: AsyncIterator[Dict]) -> bool:
+    success = await create_elasticsearch_index()
+    if not success:
+        print("✗ Failed to create Elasticsearch index. Aborting sync.")
+        return False
+    return await index_images_to_elasticsearch(client, images) is not None
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            response = await client.post(url, headers=headers, content=bulk_body)
-            if response.status_code in [200, 201]:
-                result = response.json()
-                if result.get("errors"):
-                    print(f"⚠ Some documents failed to index")
-                    for item in result.get("items", []):
-                        if "error" in item.get("index", {}):
-                            print(f"  Error: {item['index']['error']}")
-                else:
-                    print(f"✓ Successfully indexed {len(images)} images to Elasticsearch")
-                return True
-            else:
-                print(f"✗ Failed to bulk index: {response.status_code} - {response.text}")
-                return False
-        except Exception as e:
-            print(f"✗ Error indexing to Elasticsearch: {e}")
-            return False
+
+async def sync_images_incremental() -> bool:
+    """Apply only rows changed or deleted since the last sync"""
+    print("=" * 60)
+    print("Wildlife Images Incremental Sync: Supabase → Elasticsearch")
+    print("=" * 60)
+
+    result = await sync_incremental(
+        CHECKPOINT_NAME,
+        SUPABASE_URL,
+        "wildlife_images",
+        supabase_headers(),
+        ELASTIC_CLOUD_URL,
+        WILDLIFE_IMAGE_INDEX,
+        ELASTIC_API_KEY
+    )
+    if result is None:
+        print("✗ Incremental sync failed; checkpoint unchanged")
+        print("=" * 60)
+        return False
+
+    upserted, deleted = result
+    print(f"✓ {upserted} images indexed, {deleted} deleted")
+    if upserted or deleted:
+        await invalidate_backend_image_cache()
+    print("=" * 60)
+    return True
 
 
-async def sync_images():
+async def sync_images(in_place: bool = False, keep: int = 1, incremental: bool = False):
     """Main sync function"""
+    if incremental:
+        if load_checkpoint(CHECKPOINT_NAME):
+            await sync_images_incremental()
+            return
+        print("ℹ No checkpoint yet, running a full sync first")
+
     print("=" * 60)
     print("Wildlife Images Sync: Supabase → Elasticsearch")
     print("=" * 60)
     print()
 
-    # Step 1: Fetch from Supabase
-    print("[1/3] Fetching images from Supabase...")
-    images = await fetch_images_from_supabase()
+    checkpoint = Checkpoint()
+    samples: Dict[str, str] = {}
 
-    if not images:
-        print("✗ No images found in Supabase. Aborting sync.")
-        return
-
-    print(f"      Found {len(images)} images")
-    print()
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        # Step 1: Check Supabase has images before touching the index
+        print("[1/2] Reading images from Supabase...")
+        try:
+            first, images = await peek(stream_rows(client, SUPABASE_URL, "wildlife_images", supabase_headers()))
+        except httpx.HTTPError as e:
+            print(f"✗ Error fetching from Supabase: {e}")
+            first = None
 
-    # Step 2: Create Elasticsearch index
-    print("[2/3] Creating Elasticsearch index...")
-    success = await create_elasticsearch_index()
+        if not first:
+            print("✗ No images found in Supabase. Aborting sync.")
+            return
 
-    if not success:
-        print("✗ Failed to create Elasticsearch index. Aborting sync.")
-        return
-
-    print()
+        print()
+        images = track_images(images, checkpoint, samples)
 
-    # Step 3: Sync to Elasticsearch
-    print("[3/3] Syncing images to Elasticsearch...")
-    success = await index_images_to_elasticsearch(images)
+        # Step 2: Reindex while streaming the remaining pages
+        if in_place:
+            print("[2/2] Recreating index in place...")
+            success = await reindex_in_place(client, images)
+        else:
+            print("[2/2] Building new index version and swapping alias...")
+            success = await reindex_blue_green(client, images, keep)
 
     print()
     print("=" * 60)
@@ -165,18 +366,18 @@ async def sync_images():
         print("✓ Sync completed successfully!")
         print()
         print(f"Summary:")
-        print(f"  - Total images synced: {len(images)}")
+        print(f"  - Total images synced: {len(checkpoint.ids)}")
 
         # Show some samples
         print(f"\n  Sample species:")
-        unique_species = {}
-        for img in images:
-            species = img.get('common_name', 'Unknown')
-            if species not in unique_species:
-                unique_species[species] = img
-
-        for i, (species, img) in enumerate(list(unique_species.items())[:5]):
-            print(f"    • {species} ({img.get('species_name', 'N/A')})")
+        for species, species_name in samples.items():
+            print(f"    • {species} ({species_name})")
+
+        print()
+        # Later --incremental runs pick up from this sync
+        checkpoint.ids.sort()
+        save_checkpoint(CHECKPOINT_NAME, checkpoint)
+        await invalidate_backend_image_cache()
     else:
         print("✗ Sync failed!")
 
@@ -184,4 +385,10 @@ async def sync_images():
 
 
 if __name__ == "__main__":
-    asyncio.run(sync_images())
+    parser = argparse.ArgumentParser(description="Sync wildlife images from Supabase to Elasticsearch")
+    parser.add_argument("--in-place", action="store_true", help="Delete and recreate the index instead of swapping an alias")
+    parser.add_argument("--keep", type=int, default=1, help="Previous index versions to keep for rollback (default 1)")
+    parser.add_argument("--incremental", action="store_true", help="Only sync rows changed or deleted since the last run")
+    args = parser.parse_args()
+
+    asyncio.run(sync_images(in_place=args.in_place, keep=args.keep, incremental=args.incremental))
@@ -0,0 +1,268 @@
+"""
+Shared Wikimedia Commons image resolver for the population scripts.
+
+One `WikimediaResolver` holds a single HTTP client for a whole run.
+Requests go through a token-bucket rate limiter (WIKIMEDIA_RATE_LIMIT
+requests per second) with at most WIKIMEDIA_CONCURRENCY in flight. Every
+request carries `maxlag`, and lag or throttling responses are retried
+after the server's Retry-After delay.
+
+`resolve_many` looks up whether each `Category:<scientific name>` has
+files in batched `categoryinfo` queries (50 titles per request), caching
+each title's answer separately. Only species with a populated category
+get the per-species category query; the rest go straight to the file
+search fallback.
+
+Responses are cached on disk (see wikimedia_cache), so a rerun only
+contacts Commons for answers whose TTL has run out.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+from scripts.wikimedia_cache import CACHE_PATH, ResponseCache, cache_key
+
+WIKIMEDIA_API_URL = "https://commons.wikimedia.org/w/api.php"
+USER_AGENT = os.getenv("WIKIMEDIA_USER_AGENT") or "TerraTale/1.0 (wildlife image population scripts)"
+RATE_LIMIT = float(os.getenv("WIKIMEDIA_RATE_LIMIT") or "10")
+CONCURRENCY = int(os.getenv("WIKIMEDIA_CONCURRENCY") or "4")
+MAX_LAG = 5
+MAX_RETRIES = 5
+TITLES_PER_REQUEST = 50
+RESULTS_PER_SPECIES = 10
+IMAGE_MIMES = ("image/jpeg", "image/png")
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class WikimediaResolver:
+    """Finds a species photo on Wikimedia Commons by scientific name."""
+
+    def __init__(
+        self,
+        rate_limit: float = RATE_LIMIT,
+        concurrency: int = CONCURRENCY,
+        cache_path: Optional[str] = CACHE_PATH
+    ):
+        self._client = httpx.AsyncClient(timeout=30.0, headers={"User-Agent": USER_AGENT})
+        self._bucket = TokenBucket(rate_limit)
+        self._slots = asyncio.Semaphore(concurrency)
+        # An empty WIKIMEDIA_CACHE_PATH disables the response cache
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        self.requests = 0
+
+    async def __aenter__(self) -> "WikimediaResolver":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self._client.aclose()
+        if self.cache:
+            self.cache.close()
+
+    def summary(self) -> str:
+        if not self.cache:
+            return f"{self.requests} Wikimedia requests"
+        return (
+            f"{self.requests} Wikimedia requests, {self.cache.hits} cached, "
+            f"{self.cache.revalidated} revalidated"
+        )
+
+    async def query(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """Run an API query, serving it from the cache while fresh."""
+        key = cache_key(params)
+        cached = self.cache.get(key) if self.cache else None
+        if cached and self.cache.is_fresh(cached):
+            self.cache.hits += 1
+            return cached.data
+
+        response = await self._request(params, cached.validators() if cached else {})
+        if response.status_code == 304 and cached:
+            self.cache.touch(key)
+            self.cache.revalidated += 1
+            return cached.data
+
+        data = response.json()
+        if self.cache:
+            self.cache.misses += 1
+            self.cache.put(key, data, response.headers)
+        return data
+
+    async def _request(self, params: Dict[str, str], headers: Dict[str, str]) -> httpx.Response:
+        """GET an API query, waiting out maxlag and rate-limit responses.
+
+        Returns a 200 response without an API error, or a 304 when
+        `headers` carried validators the server accepted.
+        """
+        params = {**params, "action": "query", "format": "json", "maxlag": str(MAX_LAG)}
+
+        for attempt in range(MAX_RETRIES):
+            async with self._slots:
+                await self._bucket.acquire()
+                self.requests += 1
+                response = await self._client.get(WIKIMEDIA_API_URL, params=params, headers=headers)
+
+            if response.status_code == 304:
+                return response
+
+            lagged = False
+            if response.status_code == 200:
+                error = response.json().get("error", {})
+                if error.get("code") != "maxlag":
+                    if error:
+                        raise RuntimeError(f"{error.get('code')}: {error.get('info')}")
+                    return response
+                lagged = True
+            elif response.status_code not in (429, 503):
+                response.raise_for_status()
+
+            delay = _retry_after(response, default=2 ** attempt)
+            print(f"  ⚠ Wikimedia {'lagged' if lagged else 'throttled'}, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+        raise RuntimeError(f"Wikimedia still unavailable after {MAX_RETRIES} attempts")
+
+    async def category_file_counts(self, species_names: Iterable[str]) -> Dict[str, int]:
+        """Number of files in `Category:<name>` for each name (0 if missing).
+
+        Each title's answer is cached under its own key, so only titles
+        without a fresh entry are fetched, batched 50 per request.
+        """
+        counts: Dict[str, int] = {}
+        stale = []
+        for name in dict.fromkeys(species_names):
+            cached = self.cache.get(_category_key(name)) if self.cache else None
+            if cached and self.cache.is_fresh(cached):
+                self.cache.hits += 1
+                counts[name] = _category_files(cached.data)
+            else:
+                stale.append(name)
+
+        batches = [stale[i:i + TITLES_PER_REQUEST] for i in range(0, len(stale), TITLES_PER_REQUEST)]
+        for result in await asyncio.gather(*(self._category_batch(batch) for batch in batches)):
+            counts.update(result)
+        return counts
+
+    async def _category_batch(self, names: List[str]) -> Dict[str, int]:
+        titles = {f"Category:{name}": name for name in names}
+        response = await self._request({"prop": "categoryinfo", "titles": "|".join(titles)}, {})
+        query = response.json().get("query", {})
+
+        # The API reports titles in normalized form (e.g. underscores as spaces)
+        for entry in query.get("normalized", []):
+            if entry["from"] in titles:
+                titles[entry["to"]] = titles.pop(entry["from"])
+
+        # Titles that do not exist are still listed, flagged `missing`
+        pages = {name: {"title": f"Category:{name}", "missing": ""} for name in names}
+        for page in query.get("pages", {}).values():
+            name = titles.get(page.get("title"))
+            if name is not None:
+                pages[name] = page
+
+        counts = {}
+        for name, page in pages.items():
+            data = {"query": {"pages": {str(page.get("pageid", -1)): page}}}
+            counts[name] = _category_files(data)
+            if self.cache:
+                # The batch's validators describe all 50 titles, not this one
+                self.cache.misses += 1
+                self.cache.put(_category_key(name), data, {}, negative=counts[name] == 0)
+        return counts
+
+    async def resolve(self, species_name: str, category_files: Optional[int] = None) -> Optional[str]:
+        """URL of a JPEG/PNG photo of the species, or None if there is none.
+
+        Tries files in `Category:<species_name>` first (skipped when
+        `category_files` says the category is empty), then a file search.
+        """
+        try:
+            if category_files is None or category_files > 0:
+                url = _first_image(await self.query({
+                    "generator": "categorymembers",
+                    "gcmtitle": f"Category:{species_name}",
+                    "gcmlimit": str(RESULTS_PER_SPECIES),
+                    "gcmtype": "file",
+                    "prop": "imageinfo",
+                    "iiprop": "url|size|mime",
+                    "iiurlwidth": "800"
+                }))
+                if url:
+                    return url
+
+            return _first_image(await self.query({
+                "generator": "search",
+                "gsrsearch": f"File:{species_name}",
+                "gsrlimit": str(RESULTS_PER_SPECIES),
+                "gsrnamespace": "6",  # File namespace
+                "prop": "imageinfo",
+                "iiprop": "url|size|mime",
+                "iiurlwidth": "800"
+            }))
+        except Exception as e:
+            print(f"  ⚠ Wikimedia search error for {species_name}: {e}")
+            return None
+
+    async def resolve_many(self, species_names: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Resolve every name concurrently; returns name -> image URL or None."""
+        names = list(dict.fromkeys(species_names))
+        try:
+            counts: Dict[str, Optional[int]] = dict(await self.category_file_counts(names))
+        except Exception as e:
+            print(f"  ⚠ Wikimedia category lookup failed, querying each species: {e}")
+            counts = {}
+
+        urls = await asyncio.gather(*(self.resolve(name, counts.get(name)) for name in names))
+        return dict(zip(names, urls))
+
+
+def _category_key(name: str) -> str:
+    return cache_key({"prop": "categoryinfo", "titles": f"Category:{name}"})
+
+
+def _category_files(data: Dict[str, Any]) -> int:
+    for page in data.get("query", {}).get("pages", {}).values():
+        return page.get("categoryinfo", {}).get("files", 0)
+    return 0
+
+
+def _retry_after(response: httpx.Response, default: float) -> float:
+    try:
+        return max(1.0, float(response.headers.get("Retry-After", default)))
+    except ValueError:
+        return default
+
+
+def _first_image(data: Dict[str, Any]) -> Optional[str]:
+    for page in data.get("query", {}).get("pages", {}).values():
+        if "imageinfo" in page:
+            image_info = page["imageinfo"][0]
+            if image_info.get("mime") in IMAGE_MIMES:
+                return image_info.get("url")
+    return None
@@ -0,0 +1,144 @@
+"""
+On-disk cache of Wikimedia API responses for the population scripts.
+
+Responses are stored in SQLite keyed by their normalized request
+parameters. A fresh entry is served without a request. A stale one is
+revalidated with If-None-Match / If-Modified-Since when the server sent
+validators, so an unchanged answer costs one 304. Empty answers ("no
+such category", "no files found") are kept for a shorter TTL than ones
+with results, since new uploads are what would change them.
+
+Stale entries are kept rather than purged: they are what revalidation
+needs.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+CACHE_PATH = os.getenv(
+    "WIKIMEDIA_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "wikimedia.sqlite3")
+)
+CACHE_TTL = float(os.getenv("WIKIMEDIA_CACHE_TTL") or str(7 * 86400))
+CACHE_NEGATIVE_TTL = float(os.getenv("WIKIMEDIA_CACHE_NEGATIVE_TTL") or "86400")
+
+# Parameters that do not change the answer
+_IGNORED_PARAMS = {"maxlag", "format"}
+# MediaWiki treats underscores and spaces in titles alike
+_TITLE_PARAMS = {"titles", "gcmtitle", "gsrsearch"}
+
+
+def cache_key(params: Mapping[str, str]) -> str:
+    normalized = {}
+    for name, value in params.items():
+        if name in _IGNORED_PARAMS:
+            continue
+        value = str(value)
+        if name in _TITLE_PARAMS:
+            value = " ".join(value.replace("_", " ").split())
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+
+
+def is_negative(data: Dict[str, Any]) -> bool:
+    """Whether a query response found nothing.
+
+    Requested titles that do not exist are still listed under `pages`,
+    flagged `missing` or `invalid`, so those do not count as results.
+    """
+    pages = data.get("query", {}).get("pages", {})
+    return not any("missing" not in page and "invalid" not in page for page in pages.values())
+
+
+@dataclass
+class CachedResponse:
+    data: Dict[str, Any]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    negative: bool
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """SQLite store of API responses with separate positive and negative TTLs."""
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = CACHE_TTL, negative_ttl: float = CACHE_NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, data TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "fetched_at REAL NOT NULL, negative INTEGER NOT NULL)"
+        )
+        self._db.commit()
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        row = self._db.execute(
+            "SELECT data, etag, last_modified, fetched_at, negative FROM responses WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        data, etag, last_modified, fetched_at, negative = row
+        return CachedResponse(json.loads(data), etag, last_modified, fetched_at, bool(negative))
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        ttl = self.negative_ttl if entry.negative else self.ttl
+        return time.time() - entry.fetched_at < ttl
+
+    def put(
+        self,
+        key: str,
+        data: Dict[str, Any],
+        headers: Mapping[str, str],
+        negative: Optional[bool] = None
+    ):
+        """Store a response; `negative` defaults to `is_negative(data)`."""
+        if negative is None:
+            negative = is_negative(data)
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, data, etag, last_modified, fetched_at, negative) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                json.dumps(data),
+                headers.get("ETag"),
+                headers.get("Last-Modified"),
+                time.time(),
+                int(negative)
+            )
+        )
+        self._db.commit()
+
+    def touch(self, key: str):
+        """Restart an entry's TTL after the server confirmed it unchanged."""
+        self._db.execute("UPDATE responses SET fetched_at = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
+
+    def close(self):
+        self._db.close()
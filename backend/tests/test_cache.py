@@ -0,0 +1,60 @@
+import asyncio
+import sqlite3
+
+from app.cache import PersistentTTLCache
+
+
+def _rows(path):
+    db = sqlite3.connect(path)
+    try:
+        return db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+    finally:
+        db.close()
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+
+    async def write():
+        cache = PersistentTTLCache(path, max_entries=8)
+        cache.set("question", {"answer": "Manatees eat seagrass"})
+        cache.set("expired", "gone", ttl=-1)
+        await cache.close()
+
+    asyncio.run(write())
+    reloaded = PersistentTTLCache(path, max_entries=8)
+    assert reloaded.get("question") == {"answer": "Manatees eat seagrass"}
+    assert reloaded.get("expired") is None
+    assert _rows(path) == 1
+
+
+def test_table_is_trimmed_to_max_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+
+    async def write():
+        cache = PersistentTTLCache(path, max_entries=3)
+        for i in range(5):
+            cache.set(f"q{i}", i, ttl=100 + i)
+        await cache.close()
+
+    asyncio.run(write())
+    assert _rows(path) == 3
+    reloaded = PersistentTTLCache(path, max_entries=3)
+    assert [reloaded.get(f"q{i}") for i in range(5)] == [None, None, 2, 3, 4]
+
+
+def test_invalidate_removes_persisted_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+
+    async def write():
+        cache = PersistentTTLCache(path, max_entries=8)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.invalidate("a")
+        await cache.flush()
+        assert _rows(path) == 1
+        cache.invalidate()
+        await cache.close()
+
+    asyncio.run(write())
+    assert _rows(path) == 0
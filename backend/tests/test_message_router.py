@@ -0,0 +1,46 @@
+import pytest
+
+from app.message_router import MessageRouter
+
+
+@pytest.fixture
+def router():
+    return MessageRouter()
+
+
+@pytest.mark.parametrize("message", [
+    "What does the wetland protect against flooding?",
+    "How does the mangrove forest help the coast?",
+    "what does it eat",
+])
+def test_question_phrases_do_not_build_a_search_query(router, message):
+    assert router.analyze_intent(message)["search_query"] is None
+
+
+@pytest.mark.parametrize("message, query", [
+    ("Show me the jaguar", "jaguar"),
+    ("can I see a toucan?", "toucan"),
+    ("Show me herons", "heron"),
+    ("What does a manatee look like?", "manatee"),
+])
+def test_visual_requests_build_a_search_query(router, message, query):
+    intent = router.analyze_intent(message)
+    assert intent["search_images"]
+    assert intent["search_query"] == query
+
+
+@pytest.mark.parametrize("message", ["show me", "pictures?", "Show me some pictures please"])
+def test_bare_visual_requests_have_no_search_query(router, message):
+    intent = router.analyze_intent(message)
+    assert intent["search_images"]
+    assert intent["search_query"] is None
+
+
+@pytest.mark.parametrize("message, visual", [
+    ("show me", True),
+    ("pictures?", True),
+    ("What does the mangrove forest do for the coast?", False),
+    ("How does the wetland protect against flooding?", False),
+])
+def test_visual_request_excludes_question_phrases(router, message, visual):
+    assert router.analyze_intent(message)["visual_request"] is visual
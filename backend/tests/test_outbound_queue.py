@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic_settings")
+
+from app.outbound_queue import OutboundQueue, SendQueueClosed, SlowClientError
+
+
+class FakeWebSocket:
+    """Records sent frames; sending blocks while `open` is cleared."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.open = asyncio.Event()
+        self.open.set()
+
+    async def send_text(self, text):
+        await self.open.wait()
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        await self.open.wait()
+        self.sent.append(bytes(data))
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+def _queue(websocket, policy):
+    return OutboundQueue(websocket, high_watermark=100, low_watermark=40, coalesce_bytes=64, policy=policy)
+
+
+def test_audio_chunks_are_coalesced_in_order():
+    async def run():
+        websocket = FakeWebSocket()
+        websocket.open.clear()
+        outbound = _queue(websocket, "pause")
+        for chunk in (b"a" * 30, b"b" * 30, b"c" * 30):
+            await outbound.send_bytes(chunk)
+        await outbound.send_json({"type": "audio_end"})
+        websocket.open.set()
+        await asyncio.sleep(0.01)
+        outbound.close()
+        return websocket.sent
+
+    sent = asyncio.run(run())
+    assert sent[0] == b"a" * 30 + b"b" * 30
+    assert sent[1] == b"c" * 30
+    assert "audio_end" in sent[2]
+
+
+def test_pause_policy_waits_for_the_low_watermark():
+    async def run():
+        websocket = FakeWebSocket()
+        websocket.open.clear()
+        outbound = _queue(websocket, "pause")
+        for _ in range(4):
+            await outbound.send_bytes(b"x" * 30)
+
+        blocked = asyncio.create_task(outbound.send_bytes(b"y" * 30))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        websocket.open.set()
+        await asyncio.wait_for(blocked, timeout=1)
+        await asyncio.sleep(0.01)
+        outbound.close()
+        return outbound.stats()
+
+    stats = asyncio.run(run())
+    assert stats["paused_seconds"] > 0
+    assert stats["audio_chunks_dropped"] == 0
+
+
+def test_drop_policy_discards_audio_but_not_control_frames():
+    async def run():
+        websocket = FakeWebSocket()
+        websocket.open.clear()
+        outbound = _queue(websocket, "drop")
+        for _ in range(5):
+            await outbound.send_bytes(b"x" * 30)
+        await outbound.send_json({"type": "audio_end"})
+        websocket.open.set()
+        await asyncio.sleep(0.01)
+        outbound.close()
+        return websocket.sent, outbound.stats()
+
+    sent, stats = asyncio.run(run())
+    assert stats["audio_chunks_dropped"] == 1
+    assert "audio_end" in sent[-1]
+
+
+def test_disconnect_policy_closes_a_slow_client():
+    async def run():
+        websocket = FakeWebSocket()
+        websocket.open.clear()
+        outbound = _queue(websocket, "disconnect")
+        for _ in range(4):
+            await outbound.send_bytes(b"x" * 30)
+        with pytest.raises(SlowClientError):
+            await outbound.send_bytes(b"x" * 30)
+        with pytest.raises(SendQueueClosed):
+            await outbound.send_json({"type": "text"})
+        return websocket.closed_with
+
+    assert asyncio.run(run()) == 1013
+
+
+def test_discard_audio_keeps_control_frames():
+    async def run():
+        websocket = FakeWebSocket()
+        websocket.open.clear()
+        outbound = _queue(websocket, "pause")
+        await outbound.send_json({"type": "text"})
+        await outbound.send_bytes(b"x" * 30)
+        assert outbound.has_audio
+        outbound.discard_audio()
+        assert not outbound.has_audio
+        websocket.open.set()
+        await asyncio.sleep(0.01)
+        outbound.close()
+        return websocket.sent
+
+    sent = asyncio.run(run())
+    assert len(sent) == 1
+    assert '"text"' in sent[0]
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.session_store import (
+    InMemorySessionStore,
+    SessionStore,
+    SQLiteSessionStore,
+    create_session_store,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    path = str(tmp_path / "sessions.db")
+    return lambda ttl=3600.0: create_session_store(request.param, path=path, ttl=ttl)
+
+
+def test_conversation_id_round_trip(make_store):
+    async def run():
+        store = make_store()
+        assert await store.get_conversation_id("s1") is None
+        await store.set_conversation_id("s1", "conv-1")
+        await store.set_conversation_id("s1", "conv-2")
+        conversation_id = await store.get_conversation_id("s1")
+        await store.delete("s1")
+        deleted = await store.get_conversation_id("s1")
+        await store.close()
+        return conversation_id, deleted
+
+    assert asyncio.run(run()) == ("conv-2", None)
+
+
+def test_sessions_expire_after_ttl(make_store):
+    async def run():
+        store = make_store(ttl=0.05)
+        await store.set_conversation_id("s1", "conv-1")
+        fresh = await store.get_conversation_id("s1")
+        await asyncio.sleep(0.1)
+        expired = await store.get_conversation_id("s1")
+        await store.close()
+        return fresh, expired
+
+    assert asyncio.run(run()) == ("conv-1", None)
+
+
+def test_sqlite_sessions_are_shared_between_stores(tmp_path):
+    path = str(tmp_path / "sessions.db")
+
+    async def run():
+        writer = SQLiteSessionStore(path)
+        reader = SQLiteSessionStore(path)
+        await writer.set_conversation_id("s1", "conv-1")
+        conversation_id = await reader.get_conversation_id("s1")
+        await writer.close()
+        await reader.close()
+        return conversation_id
+
+    assert asyncio.run(run()) == "conv-1"
+
+
+def test_factory_picks_the_backend(tmp_path):
+    assert isinstance(create_session_store("memory"), InMemorySessionStore)
+    assert isinstance(create_session_store("sqlite", path=str(tmp_path / "s.db")), SQLiteSessionStore)
+    with pytest.raises(ValueError):
+        create_session_store("redis")
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
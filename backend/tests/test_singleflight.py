@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_request():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("q", fetch) for _ in range(3)))
+        return results, flight
+
+    results, flight = asyncio.run(run())
+    assert results == ["result"] * 3
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 2}
+
+
+def test_errors_reach_every_waiter():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("q", fail) for _ in range(2)), return_exceptions=True)
+
+    assert [str(error) for error in asyncio.run(run())] == ["upstream down"] * 2
+
+
+def test_cancelled_waiter_leaves_the_request_running_for_others():
+    started = 0
+
+    async def fetch():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.do("q", fetch))
+        second = asyncio.create_task(flight.do("q", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "result"
+    assert started == 1
+
+
+def test_last_waiter_leaving_cancels_the_request():
+    cancelled = asyncio.Event()
+
+    async def fetch():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        flight = SingleFlight()
+        waiter = asyncio.create_task(flight.do("q", fetch))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        return len(flight)
+
+    assert asyncio.run(run()) == 0
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from app.speech_pipeline import SentenceSplitter, SpeechPipeline
+
+
+def split(*pieces, min_chars=5):
+    splitter = SentenceSplitter(min_chars=min_chars)
+    sentences = []
+    for piece in pieces:
+        sentences.extend(splitter.feed(piece))
+    remainder = splitter.flush()
+    return sentences + ([remainder] if remainder else [])
+
+
+@pytest.mark.parametrize("pieces, expected", [
+    (("This is Dr. ", "Smith speaking. "), ["This is Dr. Smith speaking."]),
+    (("Herons, e.g. the great egret, fish here. ",), ["Herons, e.g. the great egret, fish here."]),
+    (("J. R. R. Tolkien wrote it. ",), ["J. R. R. Tolkien wrote it."]),
+    (("We met Mr. and Mrs. Lee at St. Mary. ",), ["We met Mr. and Mrs. Lee at St. Mary."]),
+])
+def test_abbreviations_and_initials_do_not_end_a_sentence(pieces, expected):
+    assert split(*pieces) == expected
+
+
+def test_sentence_boundaries_still_split():
+    assert split("The answer is no. ", "Sloths sleep a lot! ", "Ok?") == [
+        "The answer is no.",
+        "Sloths sleep a lot!",
+        "Ok?"
+    ]
+
+
+def _collect(pipeline, sentences):
+    async def run():
+        for sentence in sentences:
+            pipeline.add_sentence(sentence)
+        pipeline.close()
+        return [chunk async for chunk in pipeline.audio()]
+    return asyncio.run(run())
+
+
+def test_pipeline_keeps_sentence_order():
+    async def synthesize(text):
+        # Later sentences finish first
+        await asyncio.sleep(0.01 / len(text))
+        yield text.encode()
+
+    pipeline = SpeechPipeline(synthesize, max_concurrency=3)
+    assert _collect(pipeline, ["A.", "Bb.", "Ccc."]) == [b"A.", b"Bb.", b"Ccc."]
+
+
+def test_pipeline_skips_a_failed_sentence():
+    async def synthesize(text):
+        if text == "Bad.":
+            raise RuntimeError("TTS failed")
+        yield text.encode()
+
+    pipeline = SpeechPipeline(synthesize)
+    assert _collect(pipeline, ["First.", "Bad.", "Last."]) == [b"First.", b"Last."]
@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from scripts import sync_common
+from scripts.sync_common import BulkIndexer, Checkpoint, load_checkpoint, save_checkpoint, sync_incremental
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(sync_common, "STATE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_observe_keeps_the_latest_updated_at():
+    checkpoint = Checkpoint()
+    for row in [
+        {"id": 9, "updated_at": "2024-05-01T10:00:00+00:00"},
+        {"id": 10, "updated_at": "2024-05-01T12:00:00+00:00"},
+        {"id": 11, "updated_at": "2024-05-01T11:00:00+00:00"},
+        {"id": 12},
+    ]:
+        checkpoint.observe(row)
+    assert checkpoint.updated_at == "2024-05-01T12:00:00+00:00"
+    assert checkpoint.ids == ["9", "10", "11", "12"]
+
+
+def test_checkpoint_round_trip(state_dir):
+    save_checkpoint("species", Checkpoint("2024-05-01T12:00:00+00:00", ["1", "2"]))
+    assert load_checkpoint("species") == Checkpoint("2024-05-01T12:00:00+00:00", ["1", "2"])
+    assert load_checkpoint("images") is None
+
+
+def test_load_checkpoint_ignores_the_old_id_field(state_dir):
+    (state_dir / "species.json").write_text(json.dumps(
+        {"updated_at": "2024-05-01T12:00:00+00:00", "id": "10", "ids": ["10"]}
+    ))
+    assert load_checkpoint("species") == Checkpoint("2024-05-01T12:00:00+00:00", ["10"])
+
+
+class FakeBulk:
+    def __init__(self, *args, **kwargs):
+        self.indexed = []
+        self.deleted = []
+        self.ok = True
+
+    async def index(self, doc):
+        self.indexed.append(str(doc["id"]))
+
+    async def delete(self, doc_id):
+        self.deleted.append(doc_id)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    """Serves `changed` rows and the `ids` / `count` of the table."""
+    table = {"changed": [], "ids": set(), "count": 0}
+
+    def stream_changed_rows(client, base_url, name, headers, since):
+        async def rows():
+            for row in table["changed"]:
+                yield row
+        return rows()
+
+    async def count_rows(*args):
+        return table["count"]
+
+    async def fetch_ids(*args):
+        return table["ids"]
+
+    monkeypatch.setattr(sync_common, "BulkIndexer", FakeBulk)
+    monkeypatch.setattr(sync_common, "stream_changed_rows", stream_changed_rows)
+    monkeypatch.setattr(sync_common, "count_rows", count_rows)
+    monkeypatch.setattr(sync_common, "fetch_ids", fetch_ids)
+    return table
+
+
+def _sync():
+    return asyncio.run(sync_incremental("species", "http://supabase", "species", {}, "http://elastic", "species", "key"))
+
+
+def test_incremental_sync_advances_the_checkpoint(state_dir, supabase):
+    save_checkpoint("species", Checkpoint("2024-05-01T10:00:00+00:00", ["1", "2", "3"]))
+    supabase["changed"] = [{"id": 3, "updated_at": "2024-05-02T09:00:00+00:00"}]
+    supabase["ids"] = {"1", "3"}
+    supabase["count"] = 2
+
+    assert _sync() == (1, 1)
+    assert load_checkpoint("species") == Checkpoint("2024-05-02T09:00:00+00:00", ["1", "3"])
+
+
+def test_short_id_scan_deletes_nothing_and_keeps_the_checkpoint(state_dir, supabase):
+    before = Checkpoint("2024-05-01T10:00:00+00:00", ["1", "2", "3"])
+    save_checkpoint("species", before)
+    supabase["changed"] = [{"id": 3, "updated_at": "2024-05-02T09:00:00+00:00"}]
+    supabase["ids"] = {"1"}
+    supabase["count"] = 3
+
+    assert _sync() is None
+    assert load_checkpoint("species") == before
+
+
+def _bulk_response(request):
+    items = []
+    for line in request.content.decode().splitlines():
+        action = json.loads(line)
+        if "index" in action:
+            items.append({"index": {"status": 201}})
+        elif "delete" in action:
+            status = 404 if action["delete"]["_id"] == "gone" else 200
+            items.append({"delete": {"status": status}})
+    return {"errors": False, "items": items}
+
+
+def test_bulk_indexer_splits_batches_by_size():
+    bodies = []
+
+    def handler(request):
+        bodies.append(request.content)
+        return httpx.Response(200, json=_bulk_response(request))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            async with BulkIndexer(client, "http://elastic", "species", "key", max_bytes=200, concurrency=2) as bulk:
+                for i in range(10):
+                    await bulk.index({"id": i, "name": "x" * 40})
+                await bulk.delete("3")
+                await bulk.delete("gone")
+            return bulk
+
+    bulk = asyncio.run(run())
+    assert len(bodies) > 1
+    assert all(len(body) <= 200 for body in bodies)
+    assert (bulk.indexed, bulk.deleted, bulk.failed) == (10, 2, 0)
+    assert bulk.ok
+
+
+def test_bulk_indexer_counts_failed_requests():
+    async def run():
+        transport = httpx.MockTransport(lambda request: httpx.Response(500, text="unavailable"))
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with BulkIndexer(client, "http://elastic", "species", "key") as bulk:
+                await bulk.index({"id": 1})
+                await bulk.index({"id": 2})
+            return bulk
+
+    bulk = asyncio.run(run())
+    assert bulk.failed == 2
+    assert not bulk.ok
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+for module in ("fastapi", "httpx", "pydantic_settings", "google.genai", "soundfile", "numpy"):
+    pytest.importorskip(module)
+
+# Settings are read at import time; the barge-in path never contacts either service
+os.environ.setdefault("ELASTIC_CLOUD_URL", "http://elastic.invalid")
+os.environ.setdefault("ELASTIC_API_KEY", "test")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+from app.outbound_queue import OutboundQueue
+from app.websocket_handler import WebSocketHandler
+
+
+class FakeWebSocket:
+    """Records sent frames; sending blocks while `open` is cleared."""
+
+    def __init__(self):
+        self.sent = []
+        self.open = asyncio.Event()
+
+    async def send_text(self, text):
+        await self.open.wait()
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        await self.open.wait()
+        self.sent.append(bytes(data))
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+async def _client(handler):
+    websocket = FakeWebSocket()
+    handler.outbound["c1"] = OutboundQueue(websocket)
+    # The writer takes this frame and waits on the socket, so later frames
+    # stay queued where barge-in can drop them
+    await handler.outbound["c1"].send_json({"type": "session"})
+    await asyncio.sleep(0)
+    return websocket
+
+
+async def _flush(handler, websocket):
+    websocket.open.set()
+    await asyncio.sleep(0.01)
+    handler.outbound["c1"].close()
+    return websocket.sent
+
+
+def test_barge_in_cancels_the_running_turn_and_its_queued_audio():
+    async def run():
+        handler = WebSocketHandler()
+        websocket = await _client(handler)
+        cancelled = asyncio.Event()
+
+        async def speaking():
+            await handler.outbound["c1"].send_bytes(b"\0" * 320)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        handler.tasks["c1"] = asyncio.create_task(speaking())
+        await asyncio.sleep(0)
+        await handler._cancel_current("c1")
+        assert cancelled.is_set()
+        assert "c1" not in handler.tasks
+        return await _flush(handler, websocket)
+
+    assert asyncio.run(run()) == [{"type": "session"}, {"type": "interrupted"}]
+
+
+def test_barge_in_after_the_turn_finished_still_drops_unsent_audio():
+    async def run():
+        handler = WebSocketHandler()
+        websocket = await _client(handler)
+
+        async def finished():
+            await handler.outbound["c1"].send_bytes(b"\0" * 320)
+            await handler.outbound["c1"].send_json({"type": "audio_end"})
+
+        handler.tasks["c1"] = asyncio.create_task(finished())
+        await asyncio.sleep(0)
+        await handler._cancel_current("c1")
+        return await _flush(handler, websocket)
+
+    assert asyncio.run(run()) == [{"type": "session"}, {"type": "audio_end"}, {"type": "interrupted"}]
+
+
+def test_no_interruption_when_nothing_is_playing():
+    async def run():
+        handler = WebSocketHandler()
+        websocket = await _client(handler)
+
+        async def finished():
+            await handler.outbound["c1"].send_json({"type": "text", "content": "Hi"})
+
+        handler.tasks["c1"] = asyncio.create_task(finished())
+        await asyncio.sleep(0)
+        await handler._cancel_current("c1")
+        return await _flush(handler, websocket)
+
+    assert asyncio.run(run()) == [{"type": "session"}, {"type": "text", "content": "Hi"}]